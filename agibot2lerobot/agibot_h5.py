@@ -2,20 +2,62 @@ import argparse
 import gc
 import shutil
 import tempfile
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
 
 import numpy as np
+import pandas as pd
 import ray
 import torch
-from agibot_utils.agibot_utils import get_task_info, load_local_dataset
+from agibot_utils.agibot_utils import (
+    depth_to_metres,
+    get_task_info,
+    ingest_file,
+    is_complete,
+    load_failed_tasks,
+    load_local_dataset,
+    load_manifest,
+    prescan_episode,
+    save_manifest,
+)
 from agibot_utils.config import AgiBotWorld_TASK_TYPE
-from agibot_utils.lerobot_utils import compute_episode_stats, generate_features_from_config
+from agibot_utils.lerobot_utils import VideoDecodeCache, compute_episode_stats, generate_features_from_config
+from agibot_utils.plan_utils import get_episode_frames, plan_shard
+from lerobot.datasets.aggregate import aggregate_datasets
 from lerobot.datasets.lerobot_dataset import LeRobotDataset
-from lerobot.datasets.utils import validate_episode_buffer, validate_frame
+from lerobot.datasets.utils import (
+    get_file_size_in_mb,
+    load_info,
+    update_chunk_file_indices,
+    validate_episode_buffer,
+    validate_frame,
+    write_info,
+)
+from lerobot.datasets.video_utils import concatenate_video_files
 from ray.runtime_env import RuntimeEnv
 
 
 class AgiBotDataset(LeRobotDataset):
+    @classmethod
+    def create(
+        cls,
+        *args,
+        keyframe_stats: bool = False,
+        video_ingest: str = "copy",
+        video_cache_frames: int = 4096,
+        **kwargs,
+    ) -> "AgiBotDataset":
+        obj = super().create(*args, **kwargs)
+        # how source mp4s are placed in the dataset, see `ingest_file`
+        obj.video_ingest = video_ingest
+        # video stats from the closest keyframes instead of the exact sampled frames, see `sample_video_frames`
+        obj.keyframe_stats = keyframe_stats
+        # each source mp4 is decoded once for stats, frame counts and video info, see `VideoDecodeCache`
+        obj.video_cache = VideoDecodeCache(max_frames=video_cache_frames, keyframes_only=keyframe_stats)
+        # a single writer thread keeps the episodes in order, see `save_episode_in_background`
+        obj.save_executor = ThreadPoolExecutor(max_workers=1)
+        return obj
+
     def add_frame(self, frame: dict) -> None:
         """
         This function only adds the frame to the episode_buffer. Apart from images — which are written in a
@@ -51,6 +93,31 @@ class AgiBotDataset(LeRobotDataset):
 
         self.episode_buffer["size"] += 1
 
+    def add_episode(self, episode: dict, task: str) -> None:
+        """
+        Columnar version of `add_frame`: every feature of `episode` holds the whole episode with a leading time
+        dimension. Shapes are validated on the first frame only and the arrays are used as episode_buffer columns
+        as they are. To save the episode, the 'save_episode()' method then needs to be called.
+        """
+        num_frames = len(next(iter(episode.values())))
+
+        features = {key: value for key, value in self.features.items() if key in self.hf_features}  # remove video keys
+        validate_frame({**{key: value[0] for key, value in episode.items()}, "task": task}, features)
+        for key, value in episode.items():
+            if len(value) != num_frames:
+                raise ValueError(f"The feature '{key}' has {len(value)} frames, expected {num_frames}.")
+
+        if self.episode_buffer is None:
+            self.episode_buffer = self.create_episode_buffer()
+        if self.episode_buffer["size"] > 0:
+            raise ValueError("`add_episode` can not be mixed with `add_frame` within the same episode.")
+
+        self.episode_buffer["frame_index"] = np.arange(num_frames)
+        self.episode_buffer["timestamp"] = np.arange(num_frames) / self.fps
+        self.episode_buffer["task"] = [task] * num_frames
+        self.episode_buffer.update(episode)
+        self.episode_buffer["size"] = num_frames
+
     def save_episode(self, videos: dict, action_config: list, episode_data: dict | None = None) -> None:
         """
         This will save to disk the current episode in self.episode_buffer.
@@ -84,12 +151,23 @@ class AgiBotDataset(LeRobotDataset):
             # are processed separately by storing image path and frame info as meta data
             if key in ["index", "episode_index", "task_index"] or ft["dtype"] in ["video"]:
                 continue
-            episode_buffer[key] = np.stack(episode_buffer[key]).squeeze()
+            # columns from `add_episode` are already arrays
+            value = episode_buffer[key]
+            episode_buffer[key] = (value if isinstance(value, np.ndarray) else np.stack(value)).squeeze()
+            if "depth" in key:
+                # loaded as uint16 millimetres with `--depth-uint16`
+                episode_buffer[key] = depth_to_metres(episode_buffer[key])
 
         for key in self.meta.video_keys:
             episode_buffer[key] = str(videos[key])  # PosixPath -> str
+            # missing frames would leave the last timestamps of the episode without a frame
+            num_video_frames = self.video_cache.get_metadata(videos[key])["num_frames"]
+            if num_video_frames < episode_length:
+                raise ValueError(f"{videos[key]} has {num_video_frames} frames, expected {episode_length}.")
 
-        ep_stats = compute_episode_stats(episode_buffer, self.features)
+        ep_stats = compute_episode_stats(
+            episode_buffer, self.features, keyframes_only=self.keyframe_stats, video_cache=self.video_cache
+        )
 
         ep_metadata = self._save_episode_data(episode_buffer)
         has_video_keys = len(self.meta.video_keys) > 0
@@ -118,14 +196,97 @@ class AgiBotDataset(LeRobotDataset):
             # Reset episode buffer and clean up temporary images (if not already deleted during video encoding)
             self.clear_episode_buffer(delete_images=len(self.meta.image_keys) > 0)
 
+    def save_episode_in_background(self, videos: dict, action_config: list) -> Future:
+        """
+        Hands the current episode_buffer over to the writer thread, which computes the stats and writes the parquet,
+        videos and metadata, so that the next episode can be loaded meanwhile. The returned future raises the
+        exceptions of `save_episode`. Episodes are saved one at a time in submission order.
+        """
+        episode_buffer, self.episode_buffer = self.episode_buffer, None
+        return self.save_executor.submit(self._save_episode_in_order, videos, action_config, episode_buffer)
+
+    def _save_episode_in_order(self, videos: dict, action_config: list, episode_buffer: dict) -> None:
+        # the next buffer may have been created before this episode was counted, the index is only known now
+        episode_buffer["episode_index"] = self.meta.total_episodes
+        try:
+            self.save_episode(videos=videos, action_config=action_config, episode_data=episode_buffer)
+        finally:
+            self.video_cache.release(videos.values())
+
+    def _save_episode_video(self, video_key: str, episode_index: int, temp_path: Path | None = None) -> dict:
+        """
+        Same as `LeRobotDataset._save_episode_video`, except that the duration and video info come from the decode
+        pass of the source mp4 in `video_cache` instead of probing the placed file again.
+        """
+        ep_path = self._encode_temporary_episode_video(video_key, episode_index) if temp_path is None else temp_path
+        video_metadata = self.video_cache.get_metadata(self.current_videos[video_key])
+
+        ep_size_in_mb = get_file_size_in_mb(ep_path)
+        ep_duration_in_s = video_metadata["duration"]
+
+        if (
+            episode_index == 0
+            or self.meta.latest_episode is None
+            or f"videos/{video_key}/chunk_index" not in self.meta.latest_episode
+        ):
+            # Initialize indices for a new dataset made of the first episode data
+            chunk_idx, file_idx = 0, 0
+            if self.meta.episodes is not None and len(self.meta.episodes) > 0:
+                old_chunk_idx = self.meta.episodes[-1][f"videos/{video_key}/chunk_index"]
+                old_file_idx = self.meta.episodes[-1][f"videos/{video_key}/file_index"]
+                chunk_idx, file_idx = update_chunk_file_indices(old_chunk_idx, old_file_idx, self.meta.chunks_size)
+            latest_duration_in_s = 0.0
+            new_path = self.root / self.meta.video_path.format(
+                video_key=video_key, chunk_index=chunk_idx, file_index=file_idx
+            )
+            new_path.parent.mkdir(parents=True, exist_ok=True)
+            shutil.move(str(ep_path), str(new_path))
+        else:
+            # Retrieve information from the latest updated video file using latest_episode
+            latest_ep = self.meta.latest_episode
+            chunk_idx = latest_ep[f"videos/{video_key}/chunk_index"][0]
+            file_idx = latest_ep[f"videos/{video_key}/file_index"][0]
+
+            latest_path = self.root / self.meta.video_path.format(
+                video_key=video_key, chunk_index=chunk_idx, file_index=file_idx
+            )
+            latest_size_in_mb = get_file_size_in_mb(latest_path)
+            latest_duration_in_s = latest_ep[f"videos/{video_key}/to_timestamp"][0]
+
+            if latest_size_in_mb + ep_size_in_mb >= self.meta.video_files_size_in_mb:
+                # Move temporary episode video to a new video file in the dataset
+                chunk_idx, file_idx = update_chunk_file_indices(chunk_idx, file_idx, self.meta.chunks_size)
+                new_path = self.root / self.meta.video_path.format(
+                    video_key=video_key, chunk_index=chunk_idx, file_index=file_idx
+                )
+                new_path.parent.mkdir(parents=True, exist_ok=True)
+                shutil.move(str(ep_path), str(new_path))
+                latest_duration_in_s = 0.0
+            else:
+                concatenate_video_files([latest_path, ep_path], latest_path)
+
+        shutil.rmtree(str(ep_path.parent))
+
+        # video info of the first episode, which `meta.update_video_info` would read back from the dataset file
+        if episode_index == 0 and not self.meta.features[video_key].get("info", None):
+            self.meta.info["features"][video_key]["info"] = video_metadata["info"]
+            write_info(self.meta.info, self.meta.root)
+
+        return {
+            "episode_index": episode_index,
+            f"videos/{video_key}/chunk_index": chunk_idx,
+            f"videos/{video_key}/file_index": file_idx,
+            f"videos/{video_key}/from_timestamp": latest_duration_in_s,
+            f"videos/{video_key}/to_timestamp": latest_duration_in_s + ep_duration_in_s,
+        }
+
     def _encode_temporary_episode_video(self, video_key: str, episode_index: int) -> Path:
         """
-        Use ffmpeg to convert frames stored as png into mp4 videos.
-        Note: `encode_video_frames` is a blocking call. Making it asynchronous shouldn't speedup encoding,
-        since video encoding with ffmpeg is already using multithreading.
+        AgiBot videos are already encoded, the source mp4 is placed in a temporary directory of the dataset by
+        copy or reflink depending on `video_ingest`.
         """
         temp_path = Path(tempfile.mkdtemp(dir=self.root)) / f"{video_key}_{episode_index:03d}.mp4"
-        shutil.copy(self.current_videos[video_key], temp_path)
+        ingest_file(self.current_videos[video_key], temp_path, self.video_ingest)
         return temp_path
 
 
@@ -136,7 +297,76 @@ def get_all_tasks(src_path: Path, output_path: Path):
         yield (json_file, local_dir.resolve())
 
 
-def save_as_lerobot_dataset(agibot_world_config, task: tuple[Path, Path], save_depth):
+def get_episode_ids(json_file: Path) -> list[int]:
+    task_id = json_file.stem.split("_")[-1]
+    src_path = json_file.parent.parent
+    return sorted(int(f.name) for f in src_path.glob(f"observations/{task_id}/*") if f.is_dir())
+
+
+def prescan_task(
+    agibot_world_config, task: tuple[Path, Path], save_depth: bool, index_dir: Path, workers: int = 8
+) -> dict[int, int]:
+    """
+    Checks every episode of a task with `prescan_episode`, writes the index of valid and invalid episodes to
+    `<index_dir>/<task>.parquet` and returns the number of frames of each valid episode.
+    """
+    json_file, _ = task
+    src_path = json_file.parent.parent
+    task_id = json_file.stem.split("_")[-1]
+    task_eids = {episode["episode_id"] for episode in get_task_info(json_file)}
+
+    # only headers are read, threads are enough to hide the file system latency
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        rows = list(
+            executor.map(
+                lambda eid: prescan_episode(eid, src_path, task_id, save_depth, agibot_world_config),
+                get_episode_ids(json_file),
+            )
+        )
+    for row in rows:
+        if row["episode_id"] not in task_eids:
+            row["reason"] = "; ".join(filter(None, [row["reason"], "not in task_info.json"]))
+            row["valid"] = False
+
+    index = pd.DataFrame(rows, columns=list(dict.fromkeys(key for row in rows for key in row)))
+    index.insert(0, "task", json_file.stem)
+    index_dir.mkdir(parents=True, exist_ok=True)
+    index.to_parquet(index_dir / f"{json_file.stem}.parquet", index=False)
+
+    valid_eids = {row["episode_id"]: row["num_frames"] for row in rows if row["valid"]}
+    print(f"prescan done for {json_file.stem}: {len(valid_eids)} valid, {len(rows) - len(valid_eids)} invalid episodes")
+    return valid_eids
+
+
+def get_task_shards(
+    task: tuple[Path, Path], episodes_per_shard: int, episode_ids: list[int] = None
+) -> list[tuple[Path, Path, list[int]]]:
+    """
+    Splits the episodes of a task into shards of `episodes_per_shard` episodes, each converted into its own temporary
+    dataset in `<local_dir>_temp`. A task with a single shard is converted in place and needs no aggregation.
+    """
+    json_file, local_dir = task
+    episode_ids = list(episode_ids) if episode_ids is not None else get_episode_ids(json_file)
+    if episodes_per_shard <= 0 or len(episode_ids) <= episodes_per_shard:
+        return [(json_file, local_dir, episode_ids)]
+    temp_dir = local_dir.with_name(f"{local_dir.name}_temp")
+    return [
+        (json_file, temp_dir / f"shard_{i // episodes_per_shard:05d}", episode_ids[i : i + episodes_per_shard])
+        for i in range(0, len(episode_ids), episodes_per_shard)
+    ]
+
+
+def save_as_lerobot_dataset(
+    agibot_world_config,
+    task: tuple[Path, Path],
+    save_depth,
+    keyframe_stats=False,
+    video_ingest="copy",
+    depth_uint16=False,
+    depth_workers=8,
+    video_cache_frames=4096,
+    episode_ids=None,
+):
     json_file, local_dir = task
     print(f"processing {json_file.stem}, saving to {local_dir}")
     src_path = json_file.parent.parent
@@ -161,15 +391,33 @@ def save_as_lerobot_dataset(agibot_world_config, task: tuple[Path, Path], save_d
         fps=30,
         robot_type="a2d",
         features=features,
+        keyframe_stats=keyframe_stats,
+        video_ingest=video_ingest,
+        video_cache_frames=video_cache_frames,
     )
 
-    all_subdir = [f.as_posix() for f in src_path.glob(f"observations/{task_id}/*") if f.is_dir()]
+    # a shard of the task only converts its own episodes, see `get_task_shards`
+    all_subdir_eids = episode_ids if episode_ids is not None else get_episode_ids(json_file)
 
-    all_subdir_eids = sorted([int(Path(path).name) for path in all_subdir])
+    # episode N is saved in the background while episode N + 1 is loaded, at most one save is in flight
+    pending_save = None
+    converted_eids, skipped_eids = [], {}
+
+    def wait_pending_save():
+        eid, num_frames, future = pending_save
+        try:
+            future.result()
+        except Exception as e:
+            print(f"{json_file.stem}, episode_{eid}: there are some corrupted mp4s\nException details: {str(e)}")
+            skipped_eids[eid] = f"corrupted mp4s: {str(e)}"
+            return
+        converted_eids.append(eid)
+        print(f"process done for {json_file.stem}, episode_id {eid}, len {num_frames}")
 
     for eid in all_subdir_eids:
         if eid not in task_info:
             print(f"{json_file.stem}, episode_{eid} not in task_info.json, skipping...")
+            skipped_eids[eid] = "not in task_info.json"
             continue
         action_config = task_info[eid]["label_info"]["action_config"]
         raw_dataset = load_local_dataset(
@@ -178,23 +426,70 @@ def save_as_lerobot_dataset(agibot_world_config, task: tuple[Path, Path], save_d
             task_id=task_id,
             save_depth=save_depth,
             AgiBotWorld_CONFIG=agibot_world_config,
+            depth_uint16=depth_uint16,
+            depth_workers=depth_workers,
+            columnar=True,
         )
         _, frames, videos = raw_dataset
         if not all([video_path.exists() for video_path in videos.values()]):
             print(f"{json_file.stem}, episode_{eid}: some of the videos does not exist, skipping...")
+            skipped_eids[eid] = "missing videos"
             continue
 
-        for frame_data in frames:
-            frame_data["task"] = task_instruction
-            dataset.add_frame(frame_data)
-        try:
-            dataset.save_episode(videos=videos, action_config=action_config)
-        except Exception as e:
-            print(f"{json_file.stem}, episode_{eid}: there are some corrupted mp4s\nException details: {str(e)}")
-            dataset.episode_buffer = None
-            continue
+        dataset.add_episode(frames, task_instruction)
+        num_frames = dataset.episode_buffer["size"]
+        if pending_save is not None:
+            wait_pending_save()
+        pending_save = (eid, num_frames, dataset.save_episode_in_background(videos, action_config))
         gc.collect()
-        print(f"process done for {json_file.stem}, episode_id {eid}, len {len(frames)}")
+
+    if pending_save is not None:
+        wait_pending_save()
+    dataset.save_executor.shutdown()
+    # close the parquet writers, shards are read back by `aggregate_datasets`
+    dataset.finalize()
+    # written last, marks the dataset as complete for `--resume`
+    save_manifest(
+        local_dir,
+        {
+            "task": json_file.stem,
+            "episode_ids": all_subdir_eids,
+            "converted": converted_eids,
+            "skipped": {str(eid): reason for eid, reason in skipped_eids.items()},
+        },
+    )
+
+
+def save_shard_as_lerobot_dataset(agibot_world_config, shard: tuple[Path, Path, list[int]], *args):
+    json_file, shard_dir, episode_ids = shard
+    save_as_lerobot_dataset(agibot_world_config, (json_file, shard_dir), *args, episode_ids=episode_ids)
+
+
+def aggregate_task(task: tuple[Path, Path], shards: list[tuple[Path, Path, list[int]]]):
+    json_file, local_dir = task
+    shard_dirs = [shard_dir for _, shard_dir, _ in shards]
+    if shard_dirs == [local_dir]:
+        return
+    print(f"aggregating {len(shard_dirs)} shards of {json_file.stem} to {local_dir}")
+    shard_dirs = [shard_dir for shard_dir in shard_dirs if load_info(shard_dir)["total_episodes"] > 0]
+    if not shard_dirs:
+        raise ValueError(f"no episode of {local_dir.name} was converted")
+    if local_dir.exists():
+        shutil.rmtree(local_dir)
+    aggregate_datasets(
+        [shard_dir.name for shard_dir in shard_dirs], json_file.stem, roots=shard_dirs, aggr_root=local_dir
+    )
+    manifests = [load_manifest(shard_dir) for shard_dir in shard_dirs]
+    save_manifest(
+        local_dir,
+        {
+            "task": json_file.stem,
+            "episode_ids": [eid for manifest in manifests for eid in manifest["episode_ids"]],
+            "converted": [eid for manifest in manifests for eid in manifest["converted"]],
+            "skipped": {eid: reason for manifest in manifests for eid, reason in manifest["skipped"].items()},
+        },
+    )
+    shutil.rmtree(shard_dirs[0].parent)
 
 
 def main(
@@ -204,6 +499,16 @@ def main(
     task_ids: list,
     cpus_per_task: int,
     save_depth: bool,
+    keyframe_stats: bool = False,
+    video_ingest: str = "copy",
+    depth_uint16: bool = False,
+    depth_workers: int = 8,
+    video_cache_frames: int = 4096,
+    episodes_per_shard: int = 0,
+    resume: bool = False,
+    retry_failed: Path = None,
+    prescan: bool = False,
+    plan: bool = False,
     debug: bool = False,
 ):
     tasks = get_all_tasks(src_path, output_path)
@@ -221,31 +526,154 @@ def main(
 
     if task_ids:
         tasks = filter(lambda task: task[0].stem in task_ids, tasks)
+    if retry_failed:
+        # only the tasks of the failure log, resuming from their completed shards
+        failed_task_ids = load_failed_tasks(retry_failed)
+        print(f"retrying {len(failed_task_ids)} failed tasks from {retry_failed}")
+        tasks = filter(lambda task: task[0].stem in failed_task_ids, tasks)
+        resume = True
+
+    tasks = list(tasks)
+    if resume and episodes_per_shard <= 0:
+        print(
+            "warning: --resume works per shard, without --episodes-per-shard it only skips complete tasks and "
+            "partly converted tasks restart from their first episode"
+        )
 
-    if debug:
-        save_as_lerobot_dataset(agibot_world_config, next(tasks), save_depth)
-    else:
+    if not debug:
         runtime_env = RuntimeEnv(
             env_vars={"HDF5_USE_FILE_LOCKING": "FALSE", "HF_DATASETS_DISABLE_PROGRESS_BARS": "TRUE"}
         )
         ray.init(runtime_env=runtime_env)
+
+    # with `--prescan`, only the episodes whose proprio and video headers agree are scheduled
+    valid_eids: dict[str, dict[int, int]] = {}
+    if prescan:
+        index_dir = (output_path / "agibotworld_prescan").resolve()
+        if debug:
+            tasks = tasks[:1]
+            valid_eids[tasks[0][0].stem] = prescan_task(agibot_world_config, tasks[0], save_depth, index_dir)
+        else:
+            remote_prescan = ray.remote(prescan_task).options(num_cpus=1)
+            futures = [
+                (task, remote_prescan.remote(agibot_world_config, task, save_depth, index_dir)) for task in tasks
+            ]
+            for task, future in futures:
+                try:
+                    valid_eids[task[0].stem] = ray.get(future)
+                except Exception as e:
+                    print(f"Exception occurred for {task[0].stem}")
+                    with open("output.txt", "a") as f:
+                        f.write(f"{task[0].stem}, exception details: {str(e)}\n")
+        print(f"prescan index saved to {index_dir}")
+        for task in tasks:
+            if task[0].stem in valid_eids and not valid_eids[task[0].stem]:
+                print(f"skipping {task[0].stem}, the prescan found no valid episode")
+        tasks = [task for task in tasks if valid_eids.get(task[0].stem)]
+
+    # the biggest tasks first, so that their aggregation is not all that is left running at the end
+    task_shards = {
+        task[0].stem: (task, get_task_shards(task, episodes_per_shard, valid_eids.get(task[0].stem))) for task in tasks
+    }
+    task_shards = dict(
+        sorted(task_shards.items(), key=lambda item: sum(len(shard[2]) for shard in item[1][1]), reverse=True)
+    )
+    args = (save_depth, keyframe_stats, video_ingest, depth_uint16, depth_workers, video_cache_frames)
+
+    # with `--resume`, complete tasks are skipped and only the shards without a manifest are converted again
+    todo_shards = {}
+    for task, ((_, local_dir), shards) in list(task_shards.items()):
+        if resume and is_complete(local_dir, [eid for _, _, episode_ids in shards for eid in episode_ids]):
+            print(f"{task} is already converted, skipping...")
+            task_shards.pop(task)
+            continue
+        todo_shards[task] = [shard for shard in shards if not (resume and is_complete(shard[1], shard[2]))]
+        if len(todo_shards[task]) < len(shards):
+            print(f"{task}: resuming, {len(shards) - len(todo_shards[task])} of {len(shards)} shards already converted")
+
+    if debug:
+        if not task_shards:
+            return
+        task = next(iter(task_shards))
+        for shard in todo_shards[task]:
+            save_shard_as_lerobot_dataset(agibot_world_config, shard, *args)
+        aggregate_task(*task_shards[task])
+    else:
         resources = ray.available_resources()
         cpus = int(resources["CPU"])
 
+        num_shards = sum(len(shards) for shards in todo_shards.values())
         print(f"Available CPUs: {cpus}, num_cpus_per_task: {cpus_per_task}")
-
-        remote_task = ray.remote(save_as_lerobot_dataset).options(num_cpus=cpus_per_task)
-        futures = []
-        for task in tasks:
-            futures.append((task[0].stem, remote_task.remote(agibot_world_config, task, save_depth)))
-
-        for task, future in futures:
+        print(f"{len(task_shards)} tasks split into {num_shards} shards")
+
+        todo = [(task, shard) for task, shards in todo_shards.items() for shard in shards]
+        shard_options = {shard[1]: {"num_cpus": cpus_per_task} for _, shard in todo}
+        if plan:
+            # resources of each shard from its camera config and episode lengths, the costliest shards first
+            nodes = [node["Resources"] for node in ray.nodes() if node["Alive"]]
+            max_cpus = int(max(node.get("CPU", 0) for node in nodes))
+            max_memory = int(max(node.get("memory", 0) for node in nodes)) or None
+            task_infos = {}
+            for task, (json_file, shard_dir, episode_ids) in todo:
+                if task not in task_infos:
+                    task_infos[task] = {episode["episode_id"]: episode for episode in get_task_info(json_file)}
+                # frame counts from the prescan, or estimated from the annotations of task_info.json
+                episode_frames = [
+                    valid_eids.get(task, {}).get(eid) or get_episode_frames(task_infos[task].get(eid, {}))
+                    for eid in episode_ids
+                ]
+                shard_options[shard_dir] = plan_shard(
+                    agibot_world_config,
+                    episode_frames,
+                    save_depth,
+                    cpus_per_task,
+                    video_cache_frames,
+                    max_cpus=max_cpus,
+                    max_memory=max_memory,
+                )
+            todo.sort(key=lambda item: shard_options[item[1][1]]["cost"], reverse=True)
+            for task in task_shards:
+                plans = [shard_options[shard[1]] for shard in todo_shards[task]]
+                if plans:
+                    print(
+                        f"{task}: {len(plans)} shards, {max(plan['num_cpus'] for plan in plans)} CPUs and "
+                        f"{max(plan['memory'] for plan in plans) / 1024**3:.1f}GiB per shard"
+                    )
+
+        # every shard is a ray task, so idle workers pick up the episodes of the big tasks instead of waiting for them
+        remote_shard = ray.remote(save_shard_as_lerobot_dataset)
+        remote_aggr = ray.remote(aggregate_task).options(num_cpus=1)
+        futures = {}
+        for task, shard in todo:
+            options = {key: value for key, value in shard_options[shard[1]].items() if key in ["num_cpus", "memory"]}
+            futures[remote_shard.options(**options).remote(agibot_world_config, shard, *args)] = (task, "shard")
+        # resumed tasks whose shards are all converted only miss their aggregation
+        for task, shards in todo_shards.items():
+            if not shards:
+                futures[remote_aggr.remote(*task_shards[task])] = (task, "aggregate")
+
+        remaining_shards = {task: len(shards) for task, shards in todo_shards.items()}
+        failed_tasks = set()
+        pending = list(futures)
+        while pending:
+            (future,), pending = ray.wait(pending, num_returns=1)
+            task, stage = futures.pop(future)
             try:
                 ray.get(future)
             except Exception as e:
                 print(f"Exception occurred for {task}")
-                with open("output.txt", "a") as f:
-                    f.write(f"{task}, exception details: {str(e)}\n")
+                if task not in failed_tasks:
+                    with open("output.txt", "a") as f:
+                        f.write(f"{task}, exception details: {str(e)}\n")
+                failed_tasks.add(task)
+            if stage != "shard":
+                continue
+            remaining_shards[task] -= 1
+            # a task is assembled as soon as its last shard is done, while the shards of other tasks keep running
+            if remaining_shards[task] == 0 and task not in failed_tasks:
+                aggr_future = remote_aggr.remote(*task_shards[task])
+                futures[aggr_future] = (task, "aggregate")
+                pending.append(aggr_future)
 
         ray.shutdown()
 
@@ -258,6 +686,45 @@ if __name__ == "__main__":
     parser.add_argument("--task-ids", type=str, nargs="+", help="task_327 task_351 ...", default=[])
     parser.add_argument("--cpus-per-task", type=int, default=3)
     parser.add_argument("--save-depth", action="store_true")
+    parser.add_argument("--keyframe-stats", action="store_true", help="approximate video stats with keyframes only")
+    parser.add_argument(
+        "--video-ingest",
+        type=str,
+        choices=["copy", "reflink"],
+        default="copy",
+        help="copy source mp4s, or reflink them on copy-on-write filesystems",
+    )
+    parser.add_argument("--depth-uint16", action="store_true", help="keep depth in uint16 mm until it is written")
+    parser.add_argument("--depth-workers", type=int, default=8, help="threads decoding the depth PNGs")
+    parser.add_argument(
+        "--video-cache-frames", type=int, default=4096, help="sampled video frames kept in memory for stats"
+    )
+    parser.add_argument(
+        "--episodes-per-shard",
+        type=int,
+        default=0,
+        help="episodes converted by each ray task, shards of a task are then aggregated; 0 converts whole tasks in place",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="skip converted tasks and shards, found from their manifest; a partly converted shard restarts from its first episode",
+    )
+    parser.add_argument(
+        "--retry-failed",
+        type=Path,
+        help="only convert the tasks of this failure log (e.g. output.txt), implies --resume",
+    )
+    parser.add_argument(
+        "--prescan",
+        action="store_true",
+        help="check the video headers and proprio lengths of every episode first, and only convert the valid ones",
+    )
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        help="size the ray cpus and memory of each shard from its cameras and episode lengths, costliest first",
+    )
     parser.add_argument("--debug", action="store_true")
     args = parser.parse_args()
 
@@ -1,10 +1,45 @@
 import json
+import os
+import re
+import shutil
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+import av
 import h5py
 import numpy as np
 from PIL import Image
 
+# ioctl from linux/fs.h, clones the extents of a file on copy-on-write filesystems (XFS, Btrfs)
+FICLONE = 0x40049409
+
+
+def reflink(src: Path, dst: Path) -> bool:
+    import fcntl
+
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        try:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+            return True
+        except OSError:
+            pass
+    os.remove(dst)
+    return False
+
+
+def ingest_file(src: Path, dst: Path, mode: str = "copy") -> str:
+    """
+    Places `src` at `dst` without reading its bytes in python, returns the method that was used.
+        - copy: `shutil.copy`, the kernel copies the data (sendfile)
+        - reflink: copy-on-write clone, falls back to copy across filesystems or when unsupported
+    Hardlinks are not an option: the dataset video would share its inode with the raw file, and LeRobot may rewrite
+    it in place (e.g. `shutil.move` falling back to a copy across filesystems), corrupting the source data.
+    """
+    if mode == "reflink" and reflink(src, dst):
+        return "reflink"
+    shutil.copy(src, dst)
+    return "copy"
+
 
 def get_task_info(task_json_path: str) -> dict:
     with open(task_json_path, "r") as f:
@@ -13,16 +48,95 @@ def get_task_info(task_json_path: str) -> dict:
     return task_info
 
 
-def load_depths(root_dir: str, camera_name: str):
+# written once a dataset (a task or a shard of a task) is complete, listing the episodes it was converted from
+MANIFEST_PATH = "meta/conversion_manifest.json"
+
+
+def load_manifest(dataset_dir: Path) -> dict | None:
+    manifest_path = Path(dataset_dir) / MANIFEST_PATH
+    if not manifest_path.exists():
+        return None
+    try:
+        return json.loads(manifest_path.read_text())
+    except json.JSONDecodeError:
+        return None
+
+
+def save_manifest(dataset_dir: Path, manifest: dict) -> None:
+    manifest_path = Path(dataset_dir) / MANIFEST_PATH
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    # write then rename, a dataset interrupted while writing its manifest is not mistaken for a complete one
+    tmp_path = manifest_path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(manifest, indent=4))
+    tmp_path.replace(manifest_path)
+
+
+def is_complete(dataset_dir: Path, episode_ids: list[int]) -> bool:
+    """A dataset is complete when its manifest was written for the same episodes, new episodes make it stale."""
+    manifest = load_manifest(dataset_dir)
+    return manifest is not None and manifest["episode_ids"] == list(episode_ids)
+
+
+def load_failed_tasks(log_path: Path) -> list[str]:
+    """Task names of the `<task>, exception details: ...` lines of the failure log, exceptions can span lines."""
+    with open(log_path, "r") as f:
+        matches = [re.match(r"^(task_\w+), exception details:", line) for line in f]
+    return list(dict.fromkeys(match.group(1) for match in matches if match))
+
+
+# depth PNGs hold uint16 millimetres
+DEPTH_SCALE = 1000
+
+
+def load_depths(root_dir: str, camera_name: str, num_workers: int = 8, keep_uint16: bool = False) -> np.ndarray:
+    """
+    Decodes the depth PNGs of a camera with a thread pool into one preallocated (T, H, W, 1) array, in metres.
+    With `keep_uint16`, depths stay in uint16 millimetres (half the memory) until `depth_to_metres` at the writer.
+    """
     cam_path = Path(root_dir)
     all_imgs = sorted(list(cam_path.glob(f"{camera_name}*")))
-    return [np.array(Image.open(f)).astype(np.float32)[:, :, None] / 1000 for f in all_imgs]
+    if not all_imgs:
+        return np.empty((0, 0, 0, 1), dtype=np.uint16 if keep_uint16 else np.float32)
+
+    with Image.open(all_imgs[0]) as img:
+        height, width = img.height, img.width
+    depths = np.empty((len(all_imgs), height, width, 1), dtype=np.uint16 if keep_uint16 else np.float32)
+
+    def load_depth(i: int):
+        with Image.open(all_imgs[i]) as img:
+            depths[i, :, :, 0] = np.asarray(img)
+        if not keep_uint16:
+            np.divide(depths[i], np.float32(DEPTH_SCALE), out=depths[i])
+
+    # PIL releases the GIL while decoding
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        list(executor.map(load_depth, range(len(all_imgs))))
+    return depths
+
+
+def depth_to_metres(depths: np.ndarray) -> np.ndarray:
+    if depths.dtype == np.float32:
+        return depths
+    metres = depths.astype(np.float32)
+    np.divide(metres, np.float32(DEPTH_SCALE), out=metres)
+    return metres
 
 
 def load_local_dataset(
-    episode_id: int, src_path: str, task_id: int, save_depth: bool, AgiBotWorld_CONFIG: dict
-) -> tuple[list, dict]:
-    """Load local dataset and return a dict with observations and actions"""
+    episode_id: int,
+    src_path: str,
+    task_id: int,
+    save_depth: bool,
+    AgiBotWorld_CONFIG: dict,
+    depth_uint16: bool = False,
+    depth_workers: int = 8,
+    columnar: bool = False,
+) -> tuple[list | dict, dict]:
+    """
+    Load local dataset and return a dict with observations and actions.
+    With `columnar`, frames are returned as `{key: ndarray[T, ...]}` for `AgiBotDataset.add_episode`, instead of a
+    list of per-frame dicts.
+    """
     ob_dir = Path(src_path) / f"observations/{task_id}/{episode_id}"
     proprio_dir = Path(src_path) / f"proprio_stats/{task_id}/{episode_id}"
 
@@ -52,44 +166,118 @@ def load_local_dataset(
                 action[action_key] = new_action_value
             elif len(action_value) > num_frames:
                 print("corrupt data, skipping")
-                return episode_id, [], {"dummy_video": Path("/path/to/no_exist")}
+                return episode_id, {} if columnar else [], {"dummy_video": Path("/path/to/no_exist")}
 
     if save_depth:
-        depth_imgs = load_depths(ob_dir / "depth", "head_depth")
+        depth_imgs = load_depths(ob_dir / "depth", "head_depth", depth_workers, keep_uint16=depth_uint16)
         assert num_frames == len(depth_imgs), "Number of images and states are not equal"
 
     state_key_prefix_len = len("observation.states.")
     action_key_prefix_len = len("actions.")
-    frames = [
-        {
-            **({"observation.images.head_depth": depth_imgs[i]} if save_depth else {}),
-            **{
-                key: value[i]
-                if value.size
-                else np.zeros(
-                    AgiBotWorld_CONFIG["states"][key[state_key_prefix_len:]]["shape"],
-                    dtype=AgiBotWorld_CONFIG["states"][key[state_key_prefix_len:]]["dtype"],
-                )
-                for key, value in state.items()
-            },
-            **{
-                key: value[i]
-                if value.size
-                else np.zeros(
-                    AgiBotWorld_CONFIG["actions"][key[action_key_prefix_len:]]["shape"],
-                    dtype=AgiBotWorld_CONFIG["actions"][key[action_key_prefix_len:]]["dtype"],
-                )
-                for key, value in action.items()
-            },
-        }
-        for i in range(num_frames)
-    ]
-
-    videos = {
+    if columnar:
+        frames = {"observation.images.head_depth": depth_imgs} if save_depth else {}
+        for key, value in state.items():
+            config = AgiBotWorld_CONFIG["states"][key[state_key_prefix_len:]]
+            frames[key] = value if value.size else np.zeros((num_frames, *config["shape"]), dtype=config["dtype"])
+        for key, value in action.items():
+            config = AgiBotWorld_CONFIG["actions"][key[action_key_prefix_len:]]
+            frames[key] = value if value.size else np.zeros((num_frames, *config["shape"]), dtype=config["dtype"])
+    else:
+        frames = [
+            {
+                **({"observation.images.head_depth": depth_imgs[i]} if save_depth else {}),
+                **{
+                    key: value[i]
+                    if value.size
+                    else np.zeros(
+                        AgiBotWorld_CONFIG["states"][key[state_key_prefix_len:]]["shape"],
+                        dtype=AgiBotWorld_CONFIG["states"][key[state_key_prefix_len:]]["dtype"],
+                    )
+                    for key, value in state.items()
+                },
+                **{
+                    key: value[i]
+                    if value.size
+                    else np.zeros(
+                        AgiBotWorld_CONFIG["actions"][key[action_key_prefix_len:]]["shape"],
+                        dtype=AgiBotWorld_CONFIG["actions"][key[action_key_prefix_len:]]["dtype"],
+                    )
+                    for key, value in action.items()
+                },
+            }
+            for i in range(num_frames)
+        ]
+
+    videos = get_video_paths(ob_dir, AgiBotWorld_CONFIG)
+    return episode_id, frames, videos
+
+
+def get_video_paths(ob_dir: Path, AgiBotWorld_CONFIG: dict) -> dict[str, Path]:
+    return {
         f"observation.images.{key}": ob_dir / "videos" / f"{key}_color.mp4"
         if "sensor" not in key
         else ob_dir / "tactile" / f"{key}.mp4"  # HACK: handle tactile videos
         for key in AgiBotWorld_CONFIG["images"]
         if "depth" not in key
     }
-    return episode_id, frames, videos
+
+
+def probe_video(video_path: Path) -> dict:
+    """Frame count, duration and resolution of a video, read from the container header without decoding."""
+    with av.open(str(video_path)) as container:
+        stream = container.streams.video[0]
+        num_frames = stream.frames
+        if not num_frames:
+            # not stored in every header, counting the demuxed packets still decodes nothing
+            num_frames = sum(1 for packet in container.demux(stream) if packet.pts is not None)
+        if stream.duration is not None:
+            duration = float(stream.duration * stream.time_base)
+        else:
+            duration = float(container.duration / av.time_base) if container.duration else None
+        return {"frames": num_frames, "duration": duration, "height": stream.height, "width": stream.width}
+
+
+def prescan_episode(episode_id: int, src_path: str, task_id: int, save_depth: bool, AgiBotWorld_CONFIG: dict) -> dict:
+    """
+    Checks an episode from the lengths in `proprio_stats.h5` and the headers of its videos, without loading or
+    decoding anything. Returns one row of the prescan index, with the frames, duration, height and width of each
+    camera and the reasons the episode is invalid, if any.
+    """
+    ob_dir = Path(src_path) / f"observations/{task_id}/{episode_id}"
+    proprio_dir = Path(src_path) / f"proprio_stats/{task_id}/{episode_id}"
+    row = {"episode_id": episode_id, "num_frames": None, "valid": False, "reason": ""}
+
+    try:
+        with h5py.File(proprio_dir / "proprio_stats.h5", "r") as f:
+            num_frames = len(f["state/" + next(iter(AgiBotWorld_CONFIG["states"])).replace(".", "/")])
+            # the corrupt data skipped by `load_local_dataset`
+            action_lens = [len(f["action/" + key.replace(".", "/")]) for key in AgiBotWorld_CONFIG["actions"]]
+            corrupt = any(action_len > num_frames for action_len in action_lens)
+    except (OSError, KeyError) as e:
+        row["reason"] = f"proprio_stats.h5: {str(e)}"
+        return row
+    row["num_frames"] = num_frames
+
+    reasons = ["action_len > state_len"] if corrupt else []
+    for key, video_path in get_video_paths(ob_dir, AgiBotWorld_CONFIG).items():
+        camera = key.removeprefix("observation.images.")
+        if not video_path.exists():
+            reasons.append(f"{camera}: missing")
+            continue
+        try:
+            video_info = probe_video(video_path)
+        except (av.FFmpegError, IndexError) as e:
+            reasons.append(f"{camera}: unreadable ({str(e)})")
+            continue
+        row.update({f"{camera}.{name}": value for name, value in video_info.items()})
+        if video_info["frames"] < num_frames:
+            reasons.append(f"{camera}: {video_info['frames']} frames < {num_frames}")
+    if save_depth:
+        num_depths = len(list((ob_dir / "depth").glob("head_depth*")))
+        row["head_depth.frames"] = num_depths
+        if num_depths != num_frames:
+            reasons.append(f"head_depth: {num_depths} frames != {num_frames}")
+
+    row["valid"] = not reasons
+    row["reason"] = "; ".join(reasons)
+    return row
@@ -1,9 +1,11 @@
+import bisect
+import threading
+from collections import OrderedDict
+
+import av
 import numpy as np
-import torch
-import torchvision
 from lerobot.datasets.compute_stats import auto_downsample_height_width, get_feature_stats, sample_indices
-
-torchvision.set_video_backend("pyav")
+from lerobot.datasets.video_utils import get_video_pixel_channels
 
 
 def generate_features_from_config(AgiBotWorld_CONFIG):
@@ -17,23 +19,145 @@ def generate_features_from_config(AgiBotWorld_CONFIG):
     return features
 
 
-def sample_images(input):
-    if type(input) is str:
-        video_path = input
-        reader = torchvision.io.VideoReader(video_path, stream="video")
-        frames = [frame["data"] for frame in reader]
-        frames_array = torch.stack(frames).numpy()  # Shape: [T, C, H, W]
+def get_container_info(container: av.container.InputContainer) -> dict:
+    """Same as `lerobot.datasets.video_utils.get_video_info`, from an already opened container."""
+    video_stream = container.streams.video[0]
+    video_info = {
+        "video.height": video_stream.height,
+        "video.width": video_stream.width,
+        "video.codec": video_stream.codec.canonical_name,
+        "video.pix_fmt": video_stream.pix_fmt,
+        "video.is_depth_map": False,
+        "video.fps": int(video_stream.base_rate),
+        "video.channels": get_video_pixel_channels(video_stream.pix_fmt),
+    }
+    if not container.streams.audio:
+        return {**video_info, "has_audio": False}
+    audio_stream = container.streams.audio[0]
+    return {
+        **video_info,
+        "audio.channels": audio_stream.channels,
+        "audio.codec": audio_stream.codec.canonical_name,
+        "audio.bit_rate": audio_stream.bit_rate,
+        "audio.sample_rate": audio_stream.sample_rate,
+        "audio.bit_depth": audio_stream.format.bits,
+        "audio.channel_layout": audio_stream.layout.name,
+        "has_audio": True,
+    }
+
+
+def sample_video_frames(
+    video_path: str, keyframes_only: bool = False, return_metadata: bool = False
+) -> np.ndarray | tuple[np.ndarray, dict]:
+    """
+    Decodes only the frames picked by `sample_indices`, shape [S, C, H, W]. Packets are demuxed first (no decoding)
+    to get the timestamp of every frame and the keyframe positions, then for each sampled frame the decoder either
+    keeps going or seeks to the closest keyframe before it, whichever decodes fewer frames. Only the sampled frames
+    are kept in memory.
+
+    With `keyframes_only`, every sampled frame is replaced by the closest keyframe before it and non-key frames are
+    never decoded. This is approximate, but close enough for stats when keyframes are frequent.
+
+    With `return_metadata`, also returns the number of frames, the duration in seconds and the video info of the
+    file, read from the same container.
+    """
+    with av.open(str(video_path)) as container:
+        stream = container.streams.video[0]
+        packets = [(packet.pts, packet.is_keyframe) for packet in container.demux(stream) if packet.pts is not None]
+        frame_pts = sorted(pts for pts, _ in packets)
+        keyframe_pts = sorted(pts for pts, is_keyframe in packets if is_keyframe) or frame_pts[:1]
+
+        def last_keyframe(pts):
+            return keyframe_pts[max(bisect.bisect_right(keyframe_pts, pts) - 1, 0)]
+
+        targets = [frame_pts[idx] for idx in sample_indices(len(frame_pts))]
+        if keyframes_only:
+            targets = [last_keyframe(pts) for pts in targets]
+            stream.codec_context.skip_frame = "NONKEY"
 
-        sampled_indices = sample_indices(len(frames_array))
         images = None
-        for i, idx in enumerate(sampled_indices):
-            img = frames_array[idx]
-            img = auto_downsample_height_width(img)
-
+        frames, frame = None, None
+        for i, target in enumerate(targets):
+            keyframe = last_keyframe(target)
+            if frame is None or frame.pts < keyframe:
+                # a keyframe lies between the current frame and the target, jump to it
+                container.seek(keyframe, stream=stream, backward=True)
+                frames = container.decode(stream)
+                frame = next(frames)
+            while frame.pts < target:
+                frame = next(frames)
+
+            img = auto_downsample_height_width(frame.to_ndarray(format="rgb24").transpose(2, 0, 1))
             if images is None:
-                images = np.empty((len(sampled_indices), *img.shape), dtype=np.uint8)
-
+                images = np.empty((len(targets), *img.shape), dtype=np.uint8)
             images[i] = img
+
+        if return_metadata:
+            if stream.duration is not None:
+                duration = float(stream.duration * stream.time_base)
+            else:
+                duration = float(container.duration / av.time_base)
+            metadata = {"num_frames": len(frame_pts), "duration": duration, "info": get_container_info(container)}
+            return images, metadata
+
+    return images
+
+
+class VideoDecodeCache:
+    """
+    Shares the single decode pass of each source mp4 between the stats, the frame-count check and the video
+    metadata of `AgiBotDataset.save_episode`. Metadata is small and kept until `release`, while sampled frames are
+    evicted least-recently-used once more than `max_frames` of them are resident.
+    """
+
+    def __init__(self, max_frames: int = 4096, keyframes_only: bool = False):
+        self.max_frames = max_frames
+        self.keyframes_only = keyframes_only
+        self.frames = OrderedDict()
+        self.metadata = {}
+        self.num_frames = 0
+        self.lock = threading.Lock()
+
+    def _load(self, video_path: str) -> None:
+        images, metadata = sample_video_frames(video_path, self.keyframes_only, return_metadata=True)
+        self.metadata[video_path] = metadata
+        self.frames[video_path] = images
+        self.num_frames += len(images)
+        # the entry that was just decoded is never evicted
+        while self.num_frames > self.max_frames and len(self.frames) > 1:
+            _, evicted = self.frames.popitem(last=False)
+            self.num_frames -= len(evicted)
+
+    def get_frames(self, video_path: str) -> np.ndarray:
+        video_path = str(video_path)
+        with self.lock:
+            if video_path in self.frames:
+                self.frames.move_to_end(video_path)
+            else:
+                self._load(video_path)
+            return self.frames[video_path]
+
+    def get_metadata(self, video_path: str) -> dict:
+        video_path = str(video_path)
+        with self.lock:
+            if video_path not in self.metadata:
+                self._load(video_path)
+            return self.metadata[video_path]
+
+    def release(self, video_paths: list[str]) -> None:
+        with self.lock:
+            for video_path in map(str, video_paths):
+                self.metadata.pop(video_path, None)
+                images = self.frames.pop(video_path, None)
+                if images is not None:
+                    self.num_frames -= len(images)
+
+
+def sample_images(input, keyframes_only: bool = False, video_cache: VideoDecodeCache | None = None):
+    if type(input) is str and video_cache is not None:
+        images = video_cache.get_frames(input)
+    elif type(input) is str:
+        images = sample_video_frames(input, keyframes_only)
     elif type(input) is np.ndarray:
         frames_array = input[:, None, :, :]  # Shape: [T, C, H, W]
         sampled_indices = sample_indices(len(frames_array))
@@ -50,13 +174,18 @@ def sample_images(input):
     return images
 
 
-def compute_episode_stats(episode_data: dict[str, list[str] | np.ndarray], features: dict) -> dict:
+def compute_episode_stats(
+    episode_data: dict[str, list[str] | np.ndarray],
+    features: dict,
+    keyframes_only: bool = False,
+    video_cache: VideoDecodeCache | None = None,
+) -> dict:
     ep_stats = {}
     for key, data in episode_data.items():
         if features[key]["dtype"] == "string":
             continue  # HACK: we should receive np.arrays of strings
         elif features[key]["dtype"] in ["image", "video"]:
-            ep_ft_array = sample_images(data)
+            ep_ft_array = sample_images(data, keyframes_only, video_cache)
             axes_to_reduce = (0, 2, 3)  # keep channel dim
             keepdims = True
         else:
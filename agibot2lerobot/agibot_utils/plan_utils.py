@@ -0,0 +1,85 @@
+"""
+Cost model of `--plan`, which sizes the Ray CPUs and memory of every shard and submits the longest shards first.
+
+Costs are relative and only meant for scheduling:
+    - cpu: the pixels of every video camera per frame (stats decode the sampled frames and the frames up to them,
+      while placing the mp4 itself is nearly free), plus the depth pixels weighted by DEPTH_COST_FACTOR since every
+      depth frame is decoded, converted and written. CPUs scale from `--cpus-per-task`, which is the recommended
+      value for the gripper config without depth.
+    - memory: two episodes in flight (one loading while the previous one is saved), plus the frames held by the
+      video decode cache and a fixed base for the worker itself.
+"""
+
+import math
+
+import numpy as np
+from agibot_utils.config import AgiBotWorld_BETA_GRIPPER_CONFIG
+
+# python, torch and lerobot of a ray worker
+BASE_MEMORY = 2 * 1024**3
+# see `AgiBotDataset.save_episode_in_background`
+EPISODES_IN_FLIGHT = 2
+DEPTH_COST_FACTOR = 4.0
+# depth is loaded, converted to float32 metres and copied again to arrow by the writer
+DEPTH_COPIES = 3
+# sampled frames are downsampled to ~150 pixels by `auto_downsample_height_width`
+SAMPLED_FRAME_BYTES = 150 * 200 * 3
+# used when an episode has no annotated frames
+DEFAULT_EPISODE_FRAMES = 1000
+
+
+def get_episode_frames(episode_info: dict) -> int:
+    """Length of an episode from the end frame of its last annotated action, without opening the episode."""
+    action_config = episode_info.get("label_info", {}).get("action_config", [])
+    return max((action.get("end_frame", 0) for action in action_config), default=0) or DEFAULT_EPISODE_FRAMES
+
+
+def get_frame_cost(AgiBotWorld_CONFIG: dict, save_depth: bool) -> float:
+    images = AgiBotWorld_CONFIG["images"]
+    cost = sum(math.prod(image["shape"]) for image in images.values() if image["dtype"] == "video")
+    if save_depth:
+        cost += DEPTH_COST_FACTOR * math.prod(images["head_depth"]["shape"])
+    return float(cost)
+
+
+def get_frame_bytes(AgiBotWorld_CONFIG: dict, save_depth: bool) -> int:
+    frame_bytes = sum(
+        np.dtype(feature["dtype"]).itemsize * math.prod(feature["shape"])
+        for group in ["states", "actions"]
+        for feature in AgiBotWorld_CONFIG[group].values()
+    )
+    if save_depth:
+        frame_bytes += (
+            DEPTH_COPIES
+            * np.dtype(np.float32).itemsize
+            * math.prod(AgiBotWorld_CONFIG["images"]["head_depth"]["shape"])
+        )
+    return frame_bytes
+
+
+def plan_shard(
+    AgiBotWorld_CONFIG: dict,
+    episode_frames: list[int],
+    save_depth: bool,
+    cpus_per_task: int,
+    video_cache_frames: int = 4096,
+    max_cpus: int | None = None,
+    max_memory: int | None = None,
+) -> dict:
+    """Returns the `num_cpus` and `memory` (bytes) to request for a shard, and its relative `cost`."""
+    frame_cost = get_frame_cost(AgiBotWorld_CONFIG, save_depth)
+    reference_cost = get_frame_cost(AgiBotWorld_BETA_GRIPPER_CONFIG, save_depth=False)
+    num_cpus = max(1, round(cpus_per_task * frame_cost / reference_cost))
+    if max_cpus is not None:
+        num_cpus = min(num_cpus, max_cpus)
+
+    max_episode_frames = max(episode_frames, default=0)
+    memory = (
+        BASE_MEMORY
+        + EPISODES_IN_FLIGHT * max_episode_frames * get_frame_bytes(AgiBotWorld_CONFIG, save_depth)
+        + video_cache_frames * SAMPLED_FRAME_BYTES
+    )
+    if max_memory is not None:
+        memory = min(memory, max_memory)
+
+    return {"num_cpus": num_cpus, "memory": int(memory), "cost": sum(episode_frames) * frame_cost}
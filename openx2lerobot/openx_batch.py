@@ -0,0 +1,276 @@
+"""
+Convert a mixture of OpenX datasets in one run, one LeRobotDataset per source dataset.
+
+Datasets are converted by a pool of long-lived worker processes, so tensorflow is imported once per worker instead
+of once per dataset. The pool is sized to the available cores and memory, and the largest datasets are scheduled
+first (longest-processing-time ordering) so that the pool stays busy until the end. A summary report is written to
+`<local-dir>/openx_batch_report.json` after every dataset.
+
+Example:
+    python openx_batch.py \
+        --raw-dirs "/path/to/tensorflow_datasets/*/*" \
+        --local-dir /path/to/local_dir \
+        --use-videos
+
+    python openx_batch.py \
+        --data-dir /path/to/tensorflow_datasets \
+        --local-dir /path/to/local_dir \
+        --use-videos
+"""
+
+import argparse
+import glob
+import json
+import multiprocessing as mp
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from oxe_utils.configs import OXE_DATASET_CONFIGS
+from oxe_utils.inspect_utils import estimate_output_bytes, format_inspection, load_cached_inspection
+from tqdm import tqdm
+
+
+def get_dataset_name(raw_dir: Path) -> str:
+    return raw_dir.parent.name if re.match(r"^\d+\.\d+\.\d+$", raw_dir.name) else raw_dir.name
+
+
+def get_dataset_size(raw_dir: Path) -> int:
+    return sum(path.stat().st_size for path in raw_dir.rglob("*.tfrecord*"))
+
+
+def find_oxe_raw_dirs(data_dir: Path, datasets: list[str] = None) -> list[Path]:
+    raw_dirs = []
+    for dataset_name in datasets or OXE_DATASET_CONFIGS:
+        if (data_dir / dataset_name).is_dir():
+            raw_dirs.append(data_dir / dataset_name)
+        elif datasets:
+            print(f"{dataset_name}: not found in {data_dir}, skipped")
+    return raw_dirs
+
+
+def get_num_workers(cpus_per_job: int, memory_per_job: float) -> int:
+    num_cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+    memory = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") / 1024**3
+    return max(1, min(num_cpus // cpus_per_job, int(memory // memory_per_job)))
+
+
+def inspect_datasets(raw_dirs: list[Path], num_sample_episodes: int = 10, use_videos: bool = True) -> list[dict]:
+    """Prints the probed schema of every dataset, tensorflow is only imported for datasets missing from the cache."""
+    inspections = []
+    for raw_dir in raw_dirs:
+        inspection = load_cached_inspection(raw_dir, num_sample_episodes)
+        if inspection is None:
+            from openx_rlds import inspect_dataset
+
+            inspection = inspect_dataset(raw_dir, num_sample_episodes)
+        print(format_inspection(inspection, use_videos))
+        inspections.append(inspection)
+
+    output_bytes = [estimate_output_bytes(inspection, use_videos) for inspection in inspections]
+    print(
+        f"{len(inspections)} datasets, {sum(inspection['num_episodes'] for inspection in inspections)} episodes, "
+        f"~{sum(inspection['num_steps'] for inspection in inspections)} steps, "
+        f"~{sum(size for size in output_bytes if size is not None) / 1024**3:.2f}GB estimated output"
+    )
+    return inspections
+
+
+def convert_dataset(
+    raw_dir: Path, local_dir: Path, repo_namespace: str = None, shard_workers: int = 1, **kwargs
+) -> dict:
+    # imported in the worker, and only once per worker since the pool processes are reused
+    from openx_rlds import create_lerobot_dataset, parse_raw_dir
+
+    dataset_name, version, _ = parse_raw_dir(raw_dir)
+    output_dir = local_dir / f"{dataset_name}_{version}_lerobot"
+    repo_id = f"{repo_namespace}/{dataset_name}_{version}_lerobot" if repo_namespace else None
+
+    start = time.perf_counter()
+    create_lerobot_dataset(raw_dir=raw_dir, repo_id=repo_id, local_dir=local_dir, workers=shard_workers, **kwargs)
+    info = json.loads((output_dir / "meta" / "info.json").read_text())
+    return {
+        "output_dir": str(output_dir),
+        "repo_id": repo_id,
+        "seconds": round(time.perf_counter() - start, 1),
+        "total_episodes": info["total_episodes"],
+        "total_frames": info["total_frames"],
+    }
+
+
+def convert_datasets(
+    raw_dirs: list[Path],
+    local_dir: Path,
+    workers: int = None,
+    cpus_per_job: int = 4,
+    memory_per_job: float = 16,
+    **kwargs,
+) -> list[dict]:
+    raw_dirs = sorted(set(raw_dirs), key=get_dataset_size, reverse=True)
+    if workers is None:
+        workers = get_num_workers(cpus_per_job, memory_per_job)
+    local_dir.mkdir(parents=True, exist_ok=True)
+    report_path = local_dir / "openx_batch_report.json"
+
+    report = {
+        str(raw_dir): {
+            "dataset": get_dataset_name(raw_dir),
+            "raw_dir": str(raw_dir),
+            "input_bytes": get_dataset_size(raw_dir),
+            "status": "pending",
+        }
+        for raw_dir in raw_dirs
+    }
+    print(f"converting {len(raw_dirs)} datasets with {workers} workers, largest first")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn")) as executor:
+        # submitted in decreasing size, so the biggest datasets start first
+        futures = {
+            executor.submit(convert_dataset, raw_dir=raw_dir, local_dir=local_dir, **kwargs): raw_dir
+            for raw_dir in raw_dirs
+        }
+        for future in tqdm(as_completed(futures), total=len(futures), desc="Convert datasets"):
+            entry = report[str(futures[future])]
+            try:
+                entry.update(status="done", **future.result())
+            except Exception as e:
+                print(f"{entry['dataset']}: conversion failed\nException details: {str(e)}")
+                entry.update(status="failed", error=str(e))
+            report_path.write_text(json.dumps(list(report.values()), indent=4))
+
+    failed = [entry["dataset"] for entry in report.values() if entry["status"] == "failed"]
+    print(f"{len(raw_dirs) - len(failed)} datasets converted, {len(failed)} failed, report saved to {report_path}")
+    if failed:
+        print(f"failed datasets: {', '.join(failed)}")
+    return list(report.values())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument(
+        "--raw-dirs",
+        type=str,
+        nargs="+",
+        help="Raw dataset directories or glob patterns (e.g. `path/to/tensorflow_datasets/*/1.0.0`).",
+    )
+    parser.add_argument(
+        "--data-dir",
+        type=Path,
+        help="Directory containing the datasets of `OXE_DATASET_CONFIGS`, used when `--raw-dirs` is not given.",
+    )
+    parser.add_argument(
+        "--datasets",
+        type=str,
+        nargs="+",
+        help="Names of the datasets to convert from `--data-dir`, all the datasets of `OXE_DATASET_CONFIGS` found there by default.",
+    )
+    parser.add_argument(
+        "--local-dir",
+        type=Path,
+        help="Writes each converted dataset in this directory as `<dataset>_<version>_lerobot`.",
+    )
+    parser.add_argument(
+        "--repo-namespace",
+        type=str,
+        help="Community or user name on Hugging Face, datasets are pushed as `<namespace>/<dataset>_<version>_lerobot`.",
+    )
+    parser.add_argument(
+        "--push-to-hub",
+        action="store_true",
+        help="Upload to hub.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="Number of datasets converted in parallel, by default as many as the cores and memory allow.",
+    )
+    parser.add_argument(
+        "--cpus-per-job",
+        type=int,
+        default=4,
+        help="Cores reserved for each dataset when sizing the pool.",
+    )
+    parser.add_argument(
+        "--memory-per-job",
+        type=float,
+        default=16,
+        help="Memory in GB reserved for each dataset when sizing the pool.",
+    )
+    parser.add_argument(
+        "--shard-workers",
+        type=int,
+        default=1,
+        help="Number of processes converting shards of each dataset, see `openx_rlds.py --workers`.",
+    )
+    parser.add_argument(
+        "--use-videos",
+        action="store_true",
+        help="Convert each episode of the raw dataset to an mp4 video. This option allows 60 times lower disk space consumption and 25 faster loading time during training.",
+    )
+    parser.add_argument(
+        "--stream-videos",
+        action="store_true",
+        help="With `--use-videos`, encode the frames of each camera while they are produced instead of writing temporary PNGs.",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        help="Decode camera frames in windows of this many steps instead of whole episodes, bounding memory on long episodes.",
+    )
+    parser.add_argument(
+        "--transform-backend",
+        type=str,
+        choices=["tf", "numpy"],
+        default="tf",
+        help="Run `OXE_STANDARDIZATION_TRANSFORMS` as tf ops in the reader, or as their NumPy ports after it.",
+    )
+    parser.add_argument(
+        "--image-writer-process",
+        type=int,
+        default=1,
+        help="Number of processes of the image writer of each dataset.",
+    )
+    parser.add_argument(
+        "--image-writer-threads",
+        type=int,
+        default=4,
+        help="Number of threads per process of the image writer of each dataset.",
+    )
+
+    parser.add_argument(
+        "--inspect",
+        action="store_true",
+        help="Only print the schema, episode and step counts and estimated output size of every dataset, cached on disk.",
+    )
+    parser.add_argument(
+        "--inspect-episodes",
+        type=int,
+        default=10,
+        help="Number of episodes read by `--inspect` to estimate the number of steps.",
+    )
+
+    args = parser.parse_args()
+    if args.raw_dirs:
+        raw_dirs = [Path(path) for pattern in args.raw_dirs for path in sorted(glob.glob(pattern)) or [pattern]]
+    elif args.data_dir:
+        raw_dirs = find_oxe_raw_dirs(args.data_dir, args.datasets)
+    else:
+        parser.error("one of `--raw-dirs` or `--data-dir` is required")
+    if args.inspect:
+        inspect_datasets(raw_dirs, args.inspect_episodes, args.use_videos)
+        return
+    if args.local_dir is None:
+        parser.error("`--local-dir` is required unless `--inspect` is given")
+    if args.push_to_hub and args.repo_namespace is None:
+        parser.error("`--repo-namespace` is required with `--push-to-hub`")
+
+    kwargs = vars(args)
+    for key in ["raw_dirs", "data_dir", "datasets", "inspect", "inspect_episodes"]:
+        kwargs.pop(key)
+    convert_datasets(raw_dirs, **kwargs)
+
+
+if __name__ == "__main__":
+    main()
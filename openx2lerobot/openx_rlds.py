@@ -29,32 +29,94 @@ Example:
 """
 
 import argparse
+import copy
+import itertools
+import json
+import multiprocessing as mp
 import re
 import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from functools import partial
 from pathlib import Path
+from typing import Iterable
 
 import numpy as np
 import tensorflow as tf
 import tensorflow_datasets as tfds
-from lerobot.datasets.lerobot_dataset import LeRobotDataset
+from lerobot.datasets.aggregate import aggregate_datasets
+from lerobot.datasets.compute_stats import compute_episode_stats
+from lerobot.datasets.lerobot_dataset import LeRobotDataset, _encode_video_worker
+from lerobot.datasets.utils import load_info, validate_episode_buffer, validate_frame
 from lerobot.utils.constants import HF_LEROBOT_HOME
+from oxe_utils.chunk_utils import decode_step_cameras, get_camera_sources, index_step_cameras, iter_camera_chunks
 from oxe_utils.configs import OXE_DATASET_CONFIGS, ActionEncoding, StateEncoding
+from oxe_utils.filter_utils import build_episode_filter
+from oxe_utils.inspect_utils import load_cached_inspection, save_cached_inspection
+from oxe_utils.lerobot_utils import StreamingVideoEncoder, compute_sampled_images_stats
+from oxe_utils.np_transforms import OXE_STANDARDIZATION_TRANSFORMS as NP_OXE_STANDARDIZATION_TRANSFORMS
+from oxe_utils.profile_utils import StageProfiler, get_dir_size
 from oxe_utils.transforms import OXE_STANDARDIZATION_TRANSFORMS
+from tqdm import tqdm
 
 np.set_printoptions(precision=2)
 
+# options of `create_lerobot_dataset` that only change the speed of a conversion, not the converted episodes
+PERFORMANCE_OPTIONS = [
+    "image_writer_process",
+    "image_writer_threads",
+    "num_parallel_reads",
+    "num_parallel_calls",
+    "prefetch",
+    "profile",
+    "verify_transforms",
+]
 
-def transform_raw_dataset(episode, dataset_name):
-    traj = next(iter(episode["steps"].batch(episode["steps"].cardinality())))
 
-    if dataset_name in OXE_STANDARDIZATION_TRANSFORMS:
-        traj = OXE_STANDARDIZATION_TRANSFORMS[dataset_name](traj)
+def is_camera_key(key: str) -> bool:
+    return "depth" not in key and any(x in key for x in ["image", "rgb"])
+
+
+def get_image_features(builder: tfds.core.DatasetBuilder) -> dict[str, tfds.features.Image]:
+    obs = builder.info.features["steps"]["observation"]
+    return {key: value for key, value in obs.items() if isinstance(value, tfds.features.Image)}
+
+
+def decode_step_images(step, image_features: dict[str, tfds.features.Image]):
+    """
+    Images are read as encoded bytes (see `load_raw_dataset`). Only the cameras kept by `generate_features_from_raw`
+    are decoded, the other image features become 1x1 placeholders so the standardization transforms still find them.
+    Decoding happens before the transform, since some of them flip the channels of the decoded pixels.
+    """
+    for key, feature in image_features.items():
+        if is_camera_key(key):
+            step["observation"][key] = feature.decode_example(step["observation"][key])
+        else:
+            step["observation"][key] = tf.zeros((1, 1, feature.shape[-1] or 1), dtype=feature.dtype)
+    return step
 
+
+def count_step_bytes(step) -> tf.Tensor:
+    """Size of a raw step, images are counted as encoded bytes since they skip tfds decoding."""
+    return tf.add_n(
+        [
+            tf.cast(tf.reduce_sum(tf.strings.length(x)), tf.int64)
+            if x.dtype == tf.string
+            else tf.cast(tf.size(x) * x.dtype.size, tf.int64)
+            for x in tf.nest.flatten(step)
+        ]
+    )
+
+
+def get_state_obs_keys(dataset_name: str) -> list[str | None]:
     if dataset_name in OXE_DATASET_CONFIGS:
-        state_obs_keys = OXE_DATASET_CONFIGS[dataset_name]["state_obs_keys"]
-    else:
-        state_obs_keys = [None for _ in range(8)]
+        return OXE_DATASET_CONFIGS[dataset_name]["state_obs_keys"]
+    return [None for _ in range(8)]
+
+
+def standardize_trajectory(traj, dataset_name):
+    if dataset_name in OXE_STANDARDIZATION_TRANSFORMS:
+        traj = OXE_STANDARDIZATION_TRANSFORMS[dataset_name](traj)
 
     proprio = tf.concat(
         [
@@ -63,7 +125,7 @@ def transform_raw_dataset(episode, dataset_name):
                 if key is None
                 else tf.cast(traj["observation"][key], tf.float32)
             )
-            for key in state_obs_keys
+            for key in get_state_obs_keys(dataset_name)
         ],
         axis=1,
     )
@@ -75,6 +137,92 @@ def transform_raw_dataset(episode, dataset_name):
             "action": tf.cast(traj["action"], tf.float32),
         }
     )
+    return traj
+
+
+def standardize_numpy_trajectory(traj: dict, dataset_name: str) -> dict:
+    """`standardize_trajectory` with the NumPy transforms of `oxe_utils.np_transforms`, for a numpy trajectory."""
+    if dataset_name in NP_OXE_STANDARDIZATION_TRANSFORMS:
+        traj = NP_OXE_STANDARDIZATION_TRANSFORMS[dataset_name](traj)
+
+    proprio = np.concatenate(
+        [
+            (
+                np.zeros((len(traj["action"]), 1), dtype=np.float32)  # padding
+                if key is None
+                else traj["observation"][key].astype(np.float32)
+            )
+            for key in get_state_obs_keys(dataset_name)
+        ],
+        axis=1,
+    )
+
+    traj.update(
+        {
+            "proprio": proprio,
+            "task": traj.pop("language_instruction"),
+            "action": traj["action"].astype(np.float32),
+        }
+    )
+    return traj
+
+
+def check_transform_backends(traj: dict, dataset_name: str) -> None:
+    """
+    Standardizes the same raw numpy trajectory with both backends and raises if the state, action or task differ,
+    or if they don't produce the same cameras. Camera frames are only renamed, sliced or flipped by the transforms
+    and the exterior cameras of droid are swapped at random, so pixels are not compared.
+    """
+    tf_traj = transform_raw_dataset({"steps": tf.data.Dataset.from_tensor_slices(traj)}, dataset_name)["steps"]
+    tf_traj = tf.nest.map_structure(lambda x: x.numpy(), tf_traj)
+    np_traj = standardize_numpy_trajectory(copy.deepcopy(traj), dataset_name)
+
+    for key in ["proprio", "action"]:
+        if tf_traj[key].shape != np_traj[key].shape or not np.allclose(tf_traj[key], np_traj[key], atol=1e-6):
+            raise ValueError(f"{dataset_name}: the tf and numpy transforms produce different '{key}'.")
+    if list(tf_traj["task"]) != list(np_traj["task"]):
+        raise ValueError(f"{dataset_name}: the tf and numpy transforms produce different tasks.")
+    tf_cameras = {key: value.shape for key, value in tf_traj["observation"].items() if is_camera_key(key)}
+    np_cameras = {key: value.shape for key, value in np_traj["observation"].items() if is_camera_key(key)}
+    if tf_cameras != np_cameras:
+        raise ValueError(f"{dataset_name}: the tf and numpy transforms produce different cameras.")
+
+
+def transform_raw_dataset(
+    episode, dataset_name, image_features=None, chunk_size=None, profile=False, transform_backend="tf"
+):
+    if profile:
+        bytes_read = episode["steps"].map(count_step_bytes).reduce(tf.constant(0, tf.int64), lambda x, y: x + y)
+        start = tf.timestamp()
+
+    steps = episode["steps"]
+    if chunk_size:
+        # bounded memory: the transform only sees camera ids, frames are decoded later in windows of raw steps
+        camera_keys = [key for key in image_features if is_camera_key(key)]
+        episode["camera_windows"] = steps.map(
+            partial(decode_step_cameras, image_features=image_features, camera_keys=camera_keys)
+        ).batch(chunk_size)
+        steps = steps.enumerate().map(
+            partial(index_step_cameras, image_features=image_features, camera_keys=camera_keys)
+        )
+    elif image_features:
+        steps = steps.map(partial(decode_step_images, image_features=image_features))
+    traj = next(iter(steps.batch(episode["steps"].cardinality())))
+    if profile:
+        with tf.control_dependencies(tf.nest.flatten(traj)):
+            decoded = tf.timestamp()
+
+    # with the numpy backend, the raw trajectory is standardized by `standardize_numpy_trajectory` after the reader
+    if transform_backend == "tf":
+        traj = standardize_trajectory(traj, dataset_name)
+
+    if profile:
+        with tf.control_dependencies(tf.nest.flatten(traj)):
+            episode["profile"] = {
+                "bytes_read": bytes_read,
+                "decode": decoded - start,
+                "transform": tf.timestamp() - decoded,
+            }
 
     episode["steps"] = traj
     return episode
@@ -128,29 +276,457 @@ def generate_features_from_raw(builder: tfds.core.DatasetBuilder, use_videos: bo
             "names": ["height", "width", "rgb"],
         }
         for key, value in obs.items()
-        if "depth" not in key and any(x in key for x in ["image", "rgb"])
+        if is_camera_key(key)
     }
     return {**features, **DEFAULT_FEATURES}
 
 
-def save_as_lerobot_dataset(lerobot_dataset: LeRobotDataset, raw_dataset: tf.data.Dataset, **kwargs):
-    for episode in raw_dataset.as_numpy_iterator():
+class OpenXDataset(LeRobotDataset):
+    @classmethod
+    def create(
+        cls, *args, stream_videos: bool = False, profiler: StageProfiler | None = None, **kwargs
+    ) -> "OpenXDataset":
+        obj = super().create(*args, **kwargs)
+        obj.profiler = profiler if profiler is not None else StageProfiler()
+        # with stream_videos, video frames are piped to one encoder per camera instead of the image writer
+        obj.stream_videos = stream_videos and len(obj.meta.video_keys) > 0
+        obj.video_encoding_pool = (
+            ThreadPoolExecutor(max_workers=len(obj.meta.video_keys)) if obj.stream_videos else None
+        )
+        obj.video_encodings = {}
+        return obj
+
+    def add_episode(self, episode: dict, image_chunks: Iterable[dict] | None = None) -> None:
+        """
+        Bulk version of `add_frame`. Every feature of `episode` holds the whole trajectory with a leading time
+        dimension and `task` holds a single string. Shapes are validated once per episode and the arrays are
+        written to the episode_buffer as columns instead of being appended frame by frame. To save the episode,
+        the 'save_episode()' method then needs to be called.
+
+        With `image_chunks`, the image and video features are left out of `episode` and given as consecutive
+        windows of frames, `{key: frames}`, so that only one window of images is held in memory at a time.
+        """
+        task = episode.pop("task")
+        num_frames = len(episode["action"])
+
+        if image_chunks is None:
+            image_keys = [key for key in episode if self.features[key]["dtype"] in ["image", "video"]]
+            image_chunks = [{key: episode.pop(key) for key in image_keys}]
+        image_chunks = iter(image_chunks)
+        first_chunk = next(image_chunks, {})
+        image_chunks = itertools.chain([first_chunk], image_chunks)
+
+        validate_frame(
+            {**{key: value[0] for key, value in {**episode, **first_chunk}.items()}, "task": task}, self.features
+        )
+        for key, value in episode.items():
+            if len(value) != num_frames:
+                raise ValueError(f"The feature '{key}' has {len(value)} frames, but 'action' has {num_frames}.")
+
+        if self.episode_buffer is None:
+            self.episode_buffer = self.create_episode_buffer()
+        if self.episode_buffer["size"] > 0:
+            raise ValueError("`add_episode` can not be mixed with `add_frame` within the same episode.")
+
+        episode_index = self.episode_buffer["episode_index"]
+        self.episode_buffer["frame_index"] = np.arange(num_frames)
+        self.episode_buffer["timestamp"] = np.arange(num_frames) / self.fps
+        self.episode_buffer["task"] = [task] * num_frames
+        for key, value in episode.items():
+            self.episode_buffer[key] = value
+
+        encoders = {}
+        for key in first_chunk:
+            if self.stream_videos and self.features[key]["dtype"] == "video":
+                video_path = Path(tempfile.mkdtemp(dir=self.root)) / f"{key}_{episode_index:03d}.mp4"
+                encoders[key] = StreamingVideoEncoder(video_path, self.fps, num_frames)
+            else:
+                self._get_image_file_dir(episode_index, key).mkdir(parents=True, exist_ok=True)
+            self.episode_buffer[key] = []
+
+        frame_counts = dict.fromkeys(first_chunk, 0)
+        for chunk in image_chunks:
+            # cameras are encoded in parallel, one window at a time
+            encodings = [self.video_encoding_pool.submit(encoders[key].add_frames, chunk[key]) for key in encoders]
+            for key, frames in chunk.items():
+                if key not in encoders:
+                    compress_level = 1 if self.features[key]["dtype"] == "video" else 6
+                    for frame_index, image in enumerate(frames, start=frame_counts[key]):
+                        img_path = self._get_image_file_path(
+                            episode_index=episode_index, image_key=key, frame_index=frame_index
+                        )
+                        self._save_image(image, img_path, compress_level)
+                        self.episode_buffer[key].append(str(img_path))
+                frame_counts[key] += len(frames)
+            with self.profiler.stage("video_encode"):
+                for encoding in encodings:
+                    encoding.result()
+
+        for key, count in frame_counts.items():
+            if count != num_frames:
+                raise ValueError(f"The feature '{key}' has {count} frames, but 'action' has {num_frames}.")
+        for key, encoder in encoders.items():
+            self.video_encodings[key] = (encoder.video_path, self.video_encoding_pool.submit(encoder.close))
+
+        self.episode_buffer["size"] = num_frames
+
+    def save_episode(self, episode_data: dict | None = None, parallel_encoding: bool = True) -> None:
+        """
+        This will save to disk the current episode in self.episode_buffer.
+
+        Same as `LeRobotDataset.save_episode`, except that streamed videos are already being encoded by
+        `add_episode`, so their stats come from the frames sampled by the encoders, and that the whole video
+        encoding step is timed as the `video_encode` stage, including the cameras encoded in parallel.
+        """
+        if self.batch_encoding_size > 1:
+            return super().save_episode(episode_data, parallel_encoding)
+
+        episode_buffer = episode_data if episode_data is not None else self.episode_buffer
+
+        validate_episode_buffer(episode_buffer, self.meta.total_episodes, self.features)
+
+        # size and task are special cases that won't be added to hf_dataset
+        episode_length = episode_buffer.pop("size")
+        tasks = episode_buffer.pop("task")
+        episode_tasks = list(set(tasks))
+        episode_index = episode_buffer["episode_index"]
+
+        episode_buffer["index"] = np.arange(self.meta.total_frames, self.meta.total_frames + episode_length)
+        episode_buffer["episode_index"] = np.full((episode_length,), episode_index)
+
+        # Update tasks and task indices with new tasks if any
+        self.meta.save_episode_tasks(episode_tasks)
+
+        # Given tasks in natural language, find their corresponding task indices
+        episode_buffer["task_index"] = np.array([self.meta.get_task_index(task) for task in tasks])
+
+        for key, ft in self.features.items():
+            # index, episode_index, task_index are already processed above, and image and video
+            # are processed separately by storing image path and frame info as meta data
+            if key in ["index", "episode_index", "task_index"] or ft["dtype"] in ["image", "video"]:
+                continue
+            episode_buffer[key] = np.stack(episode_buffer[key])
+
+        # Wait for image writer to end, so that episode stats over images can be computed
+        self._wait_image_writer()
+        streamed_keys = self.meta.video_keys if self.stream_videos else []
+        ep_stats = compute_episode_stats(
+            {key: value for key, value in episode_buffer.items() if key not in streamed_keys}, self.features
+        )
+        for video_key in streamed_keys:
+            ep_stats[video_key] = compute_sampled_images_stats(self.video_encodings[video_key][1].result())
+
+        ep_metadata = self._save_episode_data(episode_buffer)
+        with self.profiler.stage("video_encode"):
+            if parallel_encoding and not self.stream_videos and len(self.meta.video_keys) > 1:
+                with ProcessPoolExecutor(max_workers=len(self.meta.video_keys)) as executor:
+                    encodings = {
+                        video_key: executor.submit(_encode_video_worker, video_key, episode_index, self.root, self.fps)
+                        for video_key in self.meta.video_keys
+                    }
+                for video_key, encoding in encodings.items():
+                    ep_metadata.update(self._save_episode_video(video_key, episode_index, temp_path=encoding.result()))
+            else:
+                for video_key in self.meta.video_keys:
+                    ep_metadata.update(self._save_episode_video(video_key, episode_index))
+        self.video_encodings = {}
+
+        # `meta.save_episode` need to be executed after encoding the videos
+        self.meta.save_episode(episode_index, episode_length, episode_tasks, ep_stats, ep_metadata)
+
+        if not episode_data:
+            # Reset episode buffer and clean up temporary images (if not already deleted during video encoding)
+            self.clear_episode_buffer(delete_images=len(self.meta.image_keys) > 0)
+
+    def _encode_temporary_episode_video(self, video_key: str, episode_index: int) -> Path:
+        """Return the mp4 produced by the streaming encoder of `video_key`, once it is flushed."""
+        if not self.stream_videos:
+            return super()._encode_temporary_episode_video(video_key, episode_index)
+        video_path, encoding = self.video_encodings[video_key]
+        encoding.result()
+        return video_path
+
+    def _wait_image_writer(self) -> None:
+        with self.profiler.stage("image_write"):
+            super()._wait_image_writer()
+
+
+def iter_chunked_episodes(raw_dataset: tf.data.Dataset):
+    """`as_numpy_iterator` for chunked episodes, whose nested `camera_windows` dataset stays lazy."""
+    for episode in raw_dataset:
+        camera_windows = episode.pop("camera_windows")
+        yield {**tf.nest.map_structure(lambda x: x.numpy(), episode), "camera_windows": camera_windows}
+
+
+def save_as_lerobot_dataset(
+    lerobot_dataset: OpenXDataset,
+    raw_dataset: tf.data.Dataset,
+    chunk_size: int = None,
+    image_keys: list[str] = None,
+    dataset_name: str = None,
+    transform_backend: str = "tf",
+    verify_transforms: int = 0,
+    **kwargs,
+) -> list[dict]:
+    """
+    Returns the source file and offset of every saved episode, in the order they were saved.
+    With `chunk_size`, `image_keys` are the raw image features in the order used by `index_step_cameras`.
+    With the numpy `transform_backend`, raw trajectories are standardized here, and the first `verify_transforms`
+    episodes are checked against the tf backend.
+    """
+    source_episodes = []
+    profiler = lerobot_dataset.profiler
+    episodes = iter_chunked_episodes(raw_dataset) if chunk_size else raw_dataset.as_numpy_iterator()
+    if profiler.enabled:
+        episodes = tqdm(episodes, desc="Convert episodes", unit="ep")
+        bytes_written = 0
+    while True:
+        with profiler.stage("read"):
+            episode = next(episodes, None)
+        if episode is None:
+            break
+        if transform_backend == "numpy":
+            with profiler.stage("numpy_transform"):
+                if len(source_episodes) < verify_transforms:
+                    check_transform_backends(episode["steps"], dataset_name)
+                episode["steps"] = standardize_numpy_trajectory(episode["steps"], dataset_name)
         traj = episode["steps"]
-        for i in range(traj["action"].shape[0]):
-            image_dict = {
-                f"observation.images.{key}": value[i]
-                for key, value in traj["observation"].items()
-                if "depth" not in key and any(x in key for x in ["image", "rgb"])
-            }
-            lerobot_dataset.add_frame(
+        image_dict = {
+            f"observation.images.{key}": value for key, value in traj["observation"].items() if is_camera_key(key)
+        }
+        image_chunks = None
+        if chunk_size and image_dict:
+            sources = {key: get_camera_sources(ids, image_keys) for key, ids in image_dict.items()}
+            image_chunks = iter_camera_chunks(episode["camera_windows"].as_numpy_iterator(), sources)
+            image_dict = {}
+        with profiler.stage("add_episode"):
+            lerobot_dataset.add_episode(
                 {
                     **image_dict,
-                    "observation.state": traj["proprio"][i],
-                    "action": traj["action"][i],
+                    "observation.state": traj["proprio"],
+                    "action": traj["action"],
                     "task": traj["task"][0].decode(),
                 },
+                image_chunks,
+            )
+        with profiler.stage("save_episode"):
+            lerobot_dataset.save_episode()
+        source_file, offset = episode["tfds_id"].decode().rsplit("__", 1)
+        source_episodes.append({"source_file": source_file, "offset": int(offset)})
+
+        if profiler.enabled:
+            total_written = sum(get_dir_size(lerobot_dataset.root / name) for name in ["data", "videos"])
+            profiler.end_episode(
+                source=episode["tfds_id"].decode(),
+                frames=len(traj["action"]),
+                bytes_written=total_written - bytes_written,
+                **episode["profile"],
             )
-        lerobot_dataset.save_episode()
+            bytes_written = total_written
+            episodes.set_postfix_str(profiler.summary())
+    return source_episodes
+
+
+def parse_raw_dir(raw_dir: Path) -> tuple[str, str, Path]:
+    last_part = raw_dir.name
+    if re.match(r"^\d+\.\d+\.\d+$", last_part):
+        version = last_part
+        dataset_name = raw_dir.parent.name
+        data_dir = raw_dir.parent.parent
+    else:
+        version = ""
+        dataset_name = last_part
+        data_dir = raw_dir.parent
+    return dataset_name, version, data_dir
+
+
+def get_shard_splits(builder: tfds.core.DatasetBuilder, num_shards: int, split: str = "train") -> list[str]:
+    """
+    Group the tfrecord files of `split` into at most `num_shards` contiguous sub-splits with a similar number of
+    episodes. Cuts are snapped to file boundaries, so every shard reads its own set of files.
+    """
+    file_bounds = np.cumsum([0, *builder.info.splits[split].shard_lengths])
+    num_episodes = int(file_bounds[-1])
+    cuts = {0, num_episodes}
+    for i in range(1, num_shards):
+        cuts.add(int(file_bounds[np.abs(file_bounds - num_episodes * i / num_shards).argmin()]))
+    cuts = sorted(cuts)
+    return [f"{split}[{start}:{end}]" for start, end in zip(cuts[:-1], cuts[1:])]
+
+
+def load_raw_dataset(
+    builder: tfds.core.DatasetBuilder,
+    dataset_name: str,
+    split: str,
+    num_parallel_reads: int = None,
+    num_parallel_calls: int = 1,
+    prefetch: int = 0,
+    episode_filter: dict = None,
+    chunk_size: int = None,
+    profile: bool = False,
+    transform_backend: str = "tf",
+) -> tf.data.Dataset:
+    """
+    Reader stage: drops the episodes rejected by `episode_filter` (see `build_episode_filter`), interleaves
+    `num_parallel_reads` tfrecord files, decodes and transforms `num_parallel_calls` episodes at a time, and keeps up
+    to `prefetch` transformed episodes ready, so that TFRecord decoding overlaps with LeRobot writing. Every episode
+    in flight is held decoded in memory, so both default to the sequential reader. Episodes are yielded in a
+    deterministic order.
+
+    Image features skip tfds decoding and only the cameras written to LeRobot are decoded, see `decode_step_images`.
+    With `chunk_size`, cameras are decoded lazily in windows of `chunk_size` raw steps, see `oxe_utils.chunk_utils`.
+    With `profile`, every episode also carries its size and the decode and transform times, see `StageProfiler`.
+    With the numpy `transform_backend`, episodes are yielded before the standardization transform.
+    """
+    read_config = tfds.ReadConfig(
+        add_tfds_id=True,
+        **({"interleave_cycle_length": num_parallel_reads} if num_parallel_reads else {}),
+        num_parallel_calls_for_interleave_files=num_parallel_reads or tf.data.AUTOTUNE,
+        num_parallel_calls_for_decode=num_parallel_calls,
+    )
+    episode_filter = dict(episode_filter or {})
+    episode_filter["success_only"] = episode_filter.get("success_only", False) or dataset_name == "kuka"
+    filter_fn = build_episode_filter(builder, **episode_filter)
+    image_features = get_image_features(builder)
+    decoders = {"steps": {"observation": {key: tfds.decode.SkipDecoding() for key in image_features}}}
+    raw_dataset = (
+        builder.as_dataset(split=split, shuffle_files=False, read_config=read_config, decoders=decoders)
+        .filter(filter_fn)
+        .map(
+            partial(
+                transform_raw_dataset,
+                dataset_name=dataset_name,
+                image_features=image_features,
+                chunk_size=chunk_size,
+                profile=profile,
+                transform_backend=transform_backend,
+            ),
+            num_parallel_calls=num_parallel_calls,
+        )
+    )
+    return raw_dataset.prefetch(prefetch) if prefetch else raw_dataset
+
+
+def save_split_as_lerobot_dataset(
+    raw_dir: Path,
+    split: str,
+    local_dir: Path,
+    repo_id: str,
+    fps: int,
+    robot_type: str,
+    use_videos: bool,
+    image_writer_process: int,
+    image_writer_threads: int,
+    keep_images: bool,
+    stream_videos: bool = False,
+    num_parallel_reads: int = None,
+    num_parallel_calls: int = 1,
+    prefetch: int = 0,
+    episode_filter: dict = None,
+    chunk_size: int = None,
+    profile: Path = None,
+    transform_backend: str = "tf",
+    verify_transforms: int = 0,
+) -> tuple[OpenXDataset, list[dict]]:
+    dataset_name, version, data_dir = parse_raw_dir(raw_dir)
+    builder = tfds.builder(dataset_name, data_dir=data_dir, version=version)
+    features = generate_features_from_raw(builder, use_videos)
+    raw_dataset = load_raw_dataset(
+        builder,
+        dataset_name,
+        split,
+        num_parallel_reads,
+        num_parallel_calls,
+        prefetch,
+        episode_filter,
+        chunk_size,
+        profile=profile is not None,
+        transform_backend=transform_backend,
+    )
+    profiler = StageProfiler(profile)
+
+    lerobot_dataset = OpenXDataset.create(
+        repo_id=repo_id,
+        robot_type=robot_type,
+        root=local_dir,
+        fps=int(fps),
+        use_videos=use_videos,
+        features=features,
+        # streamed videos never go through the image writer
+        image_writer_threads=0 if stream_videos and use_videos else image_writer_threads,
+        image_writer_processes=0 if stream_videos and use_videos else image_writer_process,
+        stream_videos=stream_videos and use_videos,
+        profiler=profiler,
+    )
+
+    source_episodes = save_as_lerobot_dataset(
+        lerobot_dataset,
+        raw_dataset,
+        chunk_size=chunk_size,
+        image_keys=list(get_image_features(builder)),
+        dataset_name=dataset_name,
+        transform_backend=transform_backend,
+        verify_transforms=verify_transforms,
+        keep_images=keep_images,
+    )
+    lerobot_dataset.finalize()
+    if profiler.enabled:
+        profiler.save()
+        print(f"{split}: {profiler.summary()}, profile saved to {profile}")
+    return lerobot_dataset, source_episodes
+
+
+def save_shard_as_lerobot_dataset(local_dir: Path, **kwargs) -> list[dict]:
+    # a shard left over by an interrupted run is converted again from scratch
+    if local_dir.exists():
+        shutil.rmtree(local_dir)
+    # shard profiles are kept as json next to the shard data, and merged once all shards are done
+    if kwargs.get("profile") is not None:
+        kwargs["profile"] = local_dir / "profile.json"
+    # LeRobotDataset is not picklable, only the files written by the worker are kept
+    _, source_episodes = save_split_as_lerobot_dataset(local_dir=local_dir, **kwargs)
+    return source_episodes
+
+
+def inspect_dataset(raw_dir: Path, num_sample_episodes: int = 10, use_cache: bool = True) -> dict:
+    """
+    Probes the LeRobot feature schema, the number of episodes and an estimate of the number of steps of a raw
+    dataset, from `num_sample_episodes` episodes whose images are not decoded. Results are cached on disk, see
+    `oxe_utils.inspect_utils`.
+    """
+    if use_cache and (inspection := load_cached_inspection(raw_dir, num_sample_episodes)) is not None:
+        return inspection
+
+    dataset_name, version, data_dir = parse_raw_dir(raw_dir)
+    builder = tfds.builder(dataset_name, data_dir=data_dir, version=version)
+    num_episodes = builder.info.splits["train"].num_examples
+    decoders = {"steps": {"observation": {key: tfds.decode.SkipDecoding() for key in get_image_features(builder)}}}
+    episode_lengths = list(
+        builder.as_dataset(split=f"train[:{num_sample_episodes}]", shuffle_files=False, decoders=decoders)
+        .map(lambda episode: episode["steps"].cardinality())
+        .as_numpy_iterator()
+    )
+    mean_episode_length = float(np.mean(episode_lengths)) if episode_lengths else 0.0
+    config = OXE_DATASET_CONFIGS.get(dataset_name, {})
+
+    inspection = {
+        "dataset_name": dataset_name,
+        "version": str(builder.version),
+        "raw_dir": str(raw_dir),
+        "fps": config.get("control_frequency", 10),
+        "robot_type": config.get("robot_type", "unknown"),
+        "features": {
+            key: {**feature, "shape": list(feature["shape"])}
+            for key, feature in generate_features_from_raw(builder, use_videos=True).items()
+        },
+        "num_episodes": num_episodes,
+        "num_sample_episodes": len(episode_lengths),
+        "mean_episode_length": mean_episode_length,
+        "num_steps": int(round(mean_episode_length * num_episodes)),
+        "input_bytes": sum(path.stat().st_size for path in Path(builder.data_dir).glob("*.tfrecord*")),
+    }
+    save_cached_inspection(raw_dir, num_sample_episodes, inspection)
+    return inspection
 
 
 def create_lerobot_dataset(
@@ -164,16 +740,25 @@ def create_lerobot_dataset(
     image_writer_process: int = 5,
     image_writer_threads: int = 10,
     keep_images: bool = True,
+    workers: int = 1,
+    num_shards: int = None,
+    stream_videos: bool = False,
+    num_parallel_reads: int = None,
+    num_parallel_calls: int = 1,
+    prefetch: int = 0,
+    resume: bool = False,
+    min_length: int = None,
+    max_length: int = None,
+    success_only: bool = False,
+    instruction_regex: str = None,
+    sample_fraction: float = None,
+    sample_seed: int = 0,
+    chunk_size: int = None,
+    profile: Path = None,
+    transform_backend: str = "tf",
+    verify_transforms: int = 0,
 ):
-    last_part = raw_dir.name
-    if re.match(r"^\d+\.\d+\.\d+$", last_part):
-        version = last_part
-        dataset_name = raw_dir.parent.name
-        data_dir = raw_dir.parent.parent
-    else:
-        version = ""
-        dataset_name = last_part
-        data_dir = raw_dir.parent
+    dataset_name, version, data_dir = parse_raw_dir(raw_dir)
 
     if local_dir is None:
         local_dir = Path(HF_LEROBOT_HOME)
@@ -181,15 +766,6 @@ def create_lerobot_dataset(
     if local_dir.exists():
         shutil.rmtree(local_dir)
 
-    builder = tfds.builder(dataset_name, data_dir=data_dir, version=version)
-    features = generate_features_from_raw(builder, use_videos)
-    filter_fn = lambda e: e["success"] if dataset_name == "kuka" else True
-    raw_dataset = (
-        builder.as_dataset(split="train")
-        .filter(filter_fn)
-        .map(partial(transform_raw_dataset, dataset_name=dataset_name))
-    )
-
     if fps is None:
         if dataset_name in OXE_DATASET_CONFIGS:
             fps = OXE_DATASET_CONFIGS[dataset_name]["control_frequency"]
@@ -203,18 +779,120 @@ def create_lerobot_dataset(
         else:
             robot_type = "unknown"
 
-    lerobot_dataset = LeRobotDataset.create(
-        repo_id=repo_id,
-        robot_type=robot_type,
-        root=local_dir,
-        fps=int(fps),
-        use_videos=use_videos,
-        features=features,
-        image_writer_threads=image_writer_threads,
-        image_writer_processes=image_writer_process,
-    )
+    convert_kwargs = {
+        "raw_dir": raw_dir,
+        "repo_id": repo_id,
+        "fps": fps,
+        "robot_type": robot_type,
+        "use_videos": use_videos,
+        "image_writer_process": image_writer_process,
+        "image_writer_threads": image_writer_threads,
+        "keep_images": keep_images,
+        "stream_videos": stream_videos,
+        "num_parallel_reads": num_parallel_reads,
+        "num_parallel_calls": num_parallel_calls,
+        "prefetch": prefetch,
+        "episode_filter": {
+            "min_length": min_length,
+            "max_length": max_length,
+            "success_only": success_only,
+            "instruction_regex": instruction_regex,
+            "sample_fraction": sample_fraction,
+            "sample_seed": sample_seed,
+        },
+        "chunk_size": chunk_size,
+        "profile": profile,
+        "transform_backend": transform_backend,
+        "verify_transforms": verify_transforms,
+    }
 
-    save_as_lerobot_dataset(lerobot_dataset, raw_dataset, keep_images=keep_images)
+    if num_shards is None and not resume:
+        num_shards = workers
+    if resume or num_shards > 1:
+        temp_dir = local_dir.parent / f"{local_dir.name}_temp"
+        shards_path, manifest_path = temp_dir / "shards.json", temp_dir / "manifest.jsonl"
+        options_path = temp_dir / "options.json"
+        # every option that changes the content of a shard, shards converted with other options can't be aggregated
+        options = {key: value for key, value in convert_kwargs.items() if key not in PERFORMANCE_OPTIONS}
+        options = json.loads(json.dumps(options, default=str))
+
+        completed_splits = set()
+        if resume and shards_path.exists():
+            if not options_path.exists() or json.loads(options_path.read_text()) != options:
+                raise ValueError(
+                    f"{dataset_name}: the interrupted run used other options, see {options_path}. Rerun with the same "
+                    "options, or without `--resume` to convert from scratch."
+                )
+            # keep the shards of the interrupted run, `--num-shards` can't change while resuming
+            splits = json.loads(shards_path.read_text())
+            if manifest_path.exists():
+                with open(manifest_path) as f:
+                    completed_splits = {json.loads(line)["split"] for line in f if line.strip()}
+        else:
+            if resume:
+                print(
+                    f"{dataset_name}: no resumable run in {temp_dir}, converting from scratch. A run is only "
+                    "resumable when it was started with `--resume`, `--workers` or `--num-shards`."
+                )
+            if temp_dir.exists():
+                shutil.rmtree(temp_dir)
+            temp_dir.mkdir(parents=True)
+            options_path.write_text(json.dumps(options))
+            builder = tfds.builder(dataset_name, data_dir=data_dir, version=version)
+            # a resumable run defaults to one shard per tfrecord file, so an interruption only loses the files in flight
+            splits = get_shard_splits(builder, num_shards or len(builder.info.splits["train"].shard_lengths))
+            shards_path.write_text(json.dumps(splits))
+        shard_dirs = [temp_dir / f"shard_{shard_index:05d}" for shard_index in range(len(splits))]
+        pending_shards = [
+            (split, shard_dir) for split, shard_dir in zip(splits, shard_dirs) if split not in completed_splits
+        ]
+
+        print(
+            f"converting {len(pending_shards)} shards of {dataset_name} with {workers} workers, "
+            f"{len(completed_splits)} shards already converted"
+        )
+        failed_splits = []
+        # tensorflow is not fork-safe, each worker starts from a fresh interpreter
+        with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn")) as executor:
+            futures = {
+                executor.submit(save_shard_as_lerobot_dataset, split=split, local_dir=shard_dir, **convert_kwargs): (
+                    split,
+                    shard_dir,
+                )
+                for split, shard_dir in pending_shards
+            }
+            with open(manifest_path, "a") as manifest:
+                for future in tqdm(as_completed(futures), total=len(futures), desc="Convert shards"):
+                    split, shard_dir = futures[future]
+                    try:
+                        source_episodes = future.result()
+                    except Exception as e:
+                        print(f"{dataset_name}, {split}: conversion failed\nException details: {str(e)}")
+                        failed_splits.append(split)
+                        continue
+                    manifest.write(
+                        json.dumps({"split": split, "shard_dir": shard_dir.name, "episodes": source_episodes}) + "\n"
+                    )
+                    manifest.flush()
+
+        if failed_splits:
+            raise RuntimeError(f"{len(failed_splits)} shards failed, rerun with `--resume` to retry them only.")
+
+        if profile is not None:
+            profiler = StageProfiler.merge([shard_dir / "profile.json" for shard_dir in shard_dirs], profile)
+            print(f"{dataset_name}: {profiler.summary()}, profile saved to {profile}")
+        # shards can end up empty when all of their episodes are filtered out
+        shard_dirs = [shard_dir for shard_dir in shard_dirs if load_info(shard_dir)["total_episodes"] > 0]
+        aggregate_datasets(
+            [shard_dir.name for shard_dir in shard_dirs],
+            repo_id or f"{local_dir.parent.name}/{local_dir.name}",
+            roots=shard_dirs,
+            aggr_root=local_dir,
+        )
+        shutil.rmtree(temp_dir)
+        lerobot_dataset = LeRobotDataset(repo_id=repo_id, root=local_dir) if push_to_hub else None
+    else:
+        lerobot_dataset, _ = save_split_as_lerobot_dataset(split="train", local_dir=local_dir, **convert_kwargs)
 
     if push_to_hub:
         assert repo_id is not None
@@ -243,7 +921,6 @@ def main():
     parser.add_argument(
         "--local-dir",
         type=Path,
-        required=True,
         help="When provided, writes the dataset converted to LeRobotDataset format in this directory  (e.g. `data/lerobot/aloha_mobile_chair`).",
     )
     parser.add_argument(
@@ -273,6 +950,11 @@ def main():
         action="store_true",
         help="Convert each episode of the raw dataset to an mp4 video. This option allows 60 times lower disk space consumption and 25 faster loading time during training.",
     )
+    parser.add_argument(
+        "--stream-videos",
+        action="store_true",
+        help="With `--use-videos`, pipe decoded frames straight into one encoder per camera instead of writing temporary PNGs through the image writer.",
+    )
     parser.add_argument(
         "--image-writer-process",
         type=int,
@@ -285,6 +967,103 @@ def main():
         default=10,
         help="Number of threads per process of image writer for saving images.",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of processes converting shards in parallel, each shard is saved as a temporary dataset and aggregated at the end. Image writers are started per worker.",
+    )
+    parser.add_argument(
+        "--num-shards",
+        type=int,
+        default=None,
+        help="Number of file-level shards to split the train split into, defaults to `--workers`, or to one shard per tfrecord file with `--resume`. More shards than workers balance uneven shards better.",
+    )
+
+    parser.add_argument(
+        "--num-parallel-reads",
+        type=int,
+        default=None,
+        help="Number of tfrecord files read in parallel (interleaved). Defaults to the tensorflow-datasets default.",
+    )
+    parser.add_argument(
+        "--num-parallel-calls",
+        type=int,
+        default=1,
+        help="Number of episodes decoded and transformed in parallel, -1 for tf.data.AUTOTUNE. Each one holds a whole decoded episode in memory, per worker.",
+    )
+    parser.add_argument(
+        "--prefetch",
+        type=int,
+        default=0,
+        help="Maximum number of transformed episodes queued ahead of the LeRobot writer, 0 to disable. Each one holds a whole decoded episode in memory, per worker.",
+    )
+
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Make the conversion resumable and resume an interrupted one: shards listed in the manifest of `<local-dir>/<dataset>_lerobot_temp` are kept and only the remaining ones are converted. Pass it to the first run too, so that finished shards are recorded.",
+    )
+
+    parser.add_argument(
+        "--min-length",
+        type=int,
+        default=None,
+        help="Drop episodes with fewer raw steps.",
+    )
+    parser.add_argument(
+        "--max-length",
+        type=int,
+        default=None,
+        help="Drop episodes with more raw steps.",
+    )
+    parser.add_argument(
+        "--success-only",
+        action="store_true",
+        help="Drop unsuccessful episodes, for datasets with an episode-level success flag (always on for kuka).",
+    )
+    parser.add_argument(
+        "--instruction-regex",
+        type=str,
+        default=None,
+        help="Keep episodes whose language instruction fully matches this regex (RE2 syntax).",
+    )
+    parser.add_argument(
+        "--sample-fraction",
+        type=float,
+        default=None,
+        help="Keep a deterministic random fraction of the episodes (e.g. 0.05 for a 5%% pilot).",
+    )
+    parser.add_argument(
+        "--sample-seed",
+        type=int,
+        default=0,
+        help="Seed of `--sample-fraction`, the same seed always selects the same episodes.",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        help="Decode camera frames in windows of this many steps instead of whole episodes, bounding memory on long episodes.",
+    )
+    parser.add_argument(
+        "--profile",
+        type=Path,
+        help="Record per-episode stage times, frames/s, bytes read and written, and save them to this .json or .csv file.",
+    )
+
+    parser.add_argument(
+        "--transform-backend",
+        type=str,
+        choices=["tf", "numpy"],
+        default="tf",
+        help="Run `OXE_STANDARDIZATION_TRANSFORMS` as tf ops in the reader, or as their NumPy ports after it.",
+    )
+    parser.add_argument(
+        "--verify-transforms",
+        type=int,
+        default=0,
+        help="With `--transform-backend numpy`, check the first N episodes of each shard against the tf transforms.",
+    )
 
     args = parser.parse_args()
     create_lerobot_dataset(**vars(args))
@@ -0,0 +1,69 @@
+"""
+Helpers for the chunked mode of `transform_raw_dataset`, which never holds more than `chunk_size` decoded steps.
+
+The standardization transforms run once on the whole trajectory with every camera replaced by small ids
+(`index_step_cameras`), so the low-dim features, including full-trajectory scans like the gripper relabeling, are
+computed in this first pass. The ids of the transformed cameras tell which raw camera, raw step and channel order
+each output frame comes from (`get_camera_sources`). The decoded frames are then streamed in windows of raw steps
+(`iter_camera_chunks`).
+"""
+
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+import numpy as np
+import tensorflow as tf
+import tensorflow_datasets as tfds
+
+# ids keep room for up to 4 channels, so that a channel flip like `[..., ::-1]` can be detected
+NUM_CHANNEL_IDS = 4
+
+
+def index_step_cameras(
+    index: tf.Tensor, step: dict, image_features: Dict[str, tfds.features.Image], camera_keys: List[str]
+) -> dict:
+    """Replaces the cameras of a step by `[1, 1, C]` ids of the step, camera and channel, and other images by zeros."""
+    num_keys = len(image_features)
+    for key_id, (key, feature) in enumerate(image_features.items()):
+        channels = feature.shape[-1] or 1
+        if key in camera_keys:
+            ids = (index * num_keys + key_id) * NUM_CHANNEL_IDS + tf.range(channels, dtype=tf.int64)
+            step["observation"][key] = tf.reshape(ids, (1, 1, channels))
+        else:
+            step["observation"][key] = tf.zeros((1, 1, channels), dtype=feature.dtype)
+    return step
+
+
+def decode_step_cameras(step: dict, image_features: Dict[str, tfds.features.Image], camera_keys: List[str]) -> dict:
+    return {key: image_features[key].decode_example(step["observation"][key]) for key in camera_keys}
+
+
+def get_camera_sources(ids: np.ndarray, image_keys: List[str]) -> Tuple[str, np.ndarray, bool]:
+    """
+    From the transformed `[T, 1, 1, C]` ids of an output camera, returns the raw camera it comes from, the raw step
+    of each of its frames and whether its channels were flipped.
+    """
+    frame_ids, channels = np.divmod(ids.reshape(len(ids), -1)[:, 0], NUM_CHANNEL_IDS)
+    steps, key_ids = np.divmod(frame_ids, len(image_keys))
+    if len(np.unique(key_ids)) > 1 or len(np.unique(channels)) > 1 or np.any(np.diff(steps) < 0):
+        raise ValueError(
+            "Chunked mode only supports transforms that rename, slice or flip whole cameras in time order."
+        )
+    return image_keys[key_ids[0]], steps, bool(channels[0] != 0)
+
+
+def iter_camera_chunks(
+    windows: Iterable[Dict[str, np.ndarray]], sources: Dict[str, Tuple[str, np.ndarray, bool]]
+) -> Iterator[Dict[str, np.ndarray]]:
+    """Yields the frames of every output camera, one window of decoded raw steps at a time."""
+    start = 0
+    for window in windows:
+        num_steps = len(next(iter(window.values())))
+        chunk = {}
+        for key, (raw_key, steps, flipped) in sources.items():
+            lo, hi = np.searchsorted(steps, [start, start + num_steps])
+            frames = window[raw_key][steps[lo:hi] - start]
+            chunk[key] = frames[..., ::-1] if flipped else frames
+        start += num_steps
+        # raw steps dropped by the transform (e.g. the first step of bridge) can leave a window empty
+        if any(len(frames) > 0 for frames in chunk.values()):
+            yield chunk
@@ -28,14 +28,15 @@ Configuration adopts the following structure:
 from enum import IntEnum
 from typing import Dict
 
-import tensorflow as tf
-
 
 def zero_action_filter(traj: Dict) -> bool:
     """
     Filters transitions whose actions are all-0 (only relative actions, no gripper action).
     Note: this filter is applied *after* action normalization, so need to compare to "normalized 0".
     """
+    # imported here so that the configs can be read without tensorflow (e.g. `openx_batch.py --inspect`)
+    import tensorflow as tf
+
     DROID_Q01 = tf.convert_to_tensor(
         [
             -0.7776297926902771,
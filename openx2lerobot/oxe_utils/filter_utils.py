@@ -0,0 +1,76 @@
+"""
+Declarative episode filters for RLDS datasets.
+
+Filters only look at the episode length, the episode-level success flag, the language instruction of the first step
+and the tfds_id of the episode. They are applied before `transform_raw_dataset`, so that the images of rejected
+episodes are never decoded.
+"""
+
+from typing import Any, Callable, Dict
+
+import tensorflow as tf
+import tensorflow_datasets as tfds
+
+
+def get_instruction_fn(builder: tfds.core.DatasetBuilder) -> Callable[[Dict[str, Any]], tf.Tensor]:
+    step_features = builder.info.features["steps"]
+    if "language_instruction" in step_features:
+        return lambda step: step["language_instruction"]
+    if "natural_language_instruction" in step_features["observation"]:
+        return lambda step: step["observation"]["natural_language_instruction"]
+    raise ValueError(f"{builder.name} has no string language instruction to match against.")
+
+
+def get_success_fn(builder: tfds.core.DatasetBuilder) -> Callable[[Dict[str, Any]], tf.Tensor]:
+    features = builder.info.features
+    if "success" in features:
+        return lambda episode: tf.cast(episode["success"], tf.bool)
+    if "episode_metadata" in features and "success" in features["episode_metadata"]:
+        return lambda episode: tf.cast(episode["episode_metadata"]["success"], tf.bool)
+    raise ValueError(f"{builder.name} has no episode-level success flag.")
+
+
+def build_episode_filter(
+    builder: tfds.core.DatasetBuilder,
+    min_length: int = None,
+    max_length: int = None,
+    success_only: bool = False,
+    instruction_regex: str = None,
+    sample_fraction: float = None,
+    sample_seed: int = 0,
+) -> Callable[[Dict[str, Any]], tf.Tensor]:
+    """
+    Returns a `tf.data.Dataset.filter` predicate keeping the episodes that:
+        - have between `min_length` and `max_length` raw steps (before any standardization transform)
+        - are successful, if `success_only`
+        - have a first-step language instruction fully matching `instruction_regex`
+        - fall in a deterministic `sample_fraction` of the dataset, hashed from the tfds_id and `sample_seed`,
+          so the same episodes are kept whatever the sharding or read order is
+    """
+    success_fn = get_success_fn(builder) if success_only else None
+    instruction_fn = get_instruction_fn(builder) if instruction_regex is not None else None
+    num_buckets = 1_000_000
+
+    def filter_fn(episode):
+        keep = tf.constant(True)
+        if min_length is not None or max_length is not None:
+            length = episode["steps"].cardinality()
+            if min_length is not None:
+                keep = tf.logical_and(keep, length >= min_length)
+            if max_length is not None:
+                keep = tf.logical_and(keep, length <= max_length)
+        if success_fn is not None:
+            keep = tf.logical_and(keep, success_fn(episode))
+        if instruction_fn is not None:
+            instruction = (
+                episode["steps"].take(1).map(instruction_fn).reduce(tf.constant("", tf.string), lambda _, x: x)
+            )
+            keep = tf.logical_and(keep, tf.strings.regex_full_match(instruction, instruction_regex))
+        if sample_fraction is not None:
+            bucket = tf.strings.to_hash_bucket_fast(
+                tf.strings.join([episode["tfds_id"], str(sample_seed)], separator="@"), num_buckets
+            )
+            keep = tf.logical_and(keep, bucket < int(sample_fraction * num_buckets))
+        return keep
+
+    return filter_fn
@@ -0,0 +1,91 @@
+"""
+On-disk cache of the probed schema of OpenX datasets, used by `--inspect`.
+
+Probing needs tensorflow and a `DatasetBuilder`, while a cached entry is a small json file, so this module must not
+import tensorflow. Entries are keyed by the dataset dir and version, and are probed again when `dataset_info.json`
+changes.
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+from pathlib import Path
+
+CACHE_DIR = Path(os.getenv("ANY4LEROBOT_CACHE", Path.home() / ".cache" / "any4lerobot")) / "openx_inspect"
+
+# rough sizes of the encoded frames, only meant for planning: libsvtav1 at crf 30 and PNG
+VIDEO_BYTES_PER_PIXEL = 0.05
+IMAGE_BYTES_PER_PIXEL = 1.5
+# timestamp, frame_index, episode_index, index and task_index
+INDEX_BYTES_PER_FRAME = 36
+
+
+def resolve_version_dir(raw_dir: Path) -> Path:
+    """`path/to/dataset` resolves to its latest version, like `tfds.builder` does."""
+    if re.match(r"^\d+\.\d+\.\d+$", raw_dir.name) or not raw_dir.is_dir():
+        return raw_dir
+    versions = [d for d in raw_dir.iterdir() if d.is_dir() and re.match(r"^\d+\.\d+\.\d+$", d.name)]
+    if not versions:
+        return raw_dir
+    return max(versions, key=lambda d: tuple(int(x) for x in d.name.split(".")))
+
+
+def get_cache_path(raw_dir: Path, num_sample_episodes: int) -> Path:
+    version_dir = resolve_version_dir(Path(raw_dir).resolve())
+    info_path = version_dir / "dataset_info.json"
+    mtime = info_path.stat().st_mtime_ns if info_path.exists() else 0
+    key = hashlib.sha1(f"{version_dir}:{mtime}:{num_sample_episodes}".encode()).hexdigest()[:16]
+    return CACHE_DIR / f"{version_dir.parent.name}_{version_dir.name}_{key}.json"
+
+
+def load_cached_inspection(raw_dir: Path, num_sample_episodes: int) -> dict | None:
+    cache_path = get_cache_path(raw_dir, num_sample_episodes)
+    if not cache_path.exists():
+        return None
+    try:
+        return json.loads(cache_path.read_text())
+    except json.JSONDecodeError:
+        return None
+
+
+def save_cached_inspection(raw_dir: Path, num_sample_episodes: int, inspection: dict) -> None:
+    cache_path = get_cache_path(raw_dir, num_sample_episodes)
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+    tmp_path.write_text(json.dumps(inspection, indent=4))
+    tmp_path.replace(cache_path)
+
+
+def estimate_output_bytes(inspection: dict, use_videos: bool = True) -> int | None:
+    """Returns None when a camera has a variable resolution."""
+    bytes_per_frame = INDEX_BYTES_PER_FRAME
+    for feature in inspection["features"].values():
+        if feature["dtype"] in ["image", "video"]:
+            height, width = feature["shape"][:2]
+            if height is None or width is None:
+                return None
+            bytes_per_frame += height * width * (VIDEO_BYTES_PER_PIXEL if use_videos else IMAGE_BYTES_PER_PIXEL)
+        else:
+            bytes_per_frame += 4 * math.prod(feature["shape"])
+    return int(inspection["num_steps"] * bytes_per_frame)
+
+
+def format_inspection(inspection: dict, use_videos: bool = True) -> str:
+    output_bytes = estimate_output_bytes(inspection, use_videos)
+    lines = [
+        f"{inspection['dataset_name']} {inspection['version']} ({inspection['raw_dir']})",
+        f"  fps: {inspection['fps']}, robot_type: {inspection['robot_type']}",
+        f"  episodes: {inspection['num_episodes']}",
+        f"  steps: ~{inspection['num_steps']} (mean {inspection['mean_episode_length']:.1f} steps "
+        f"over {inspection['num_sample_episodes']} sampled episodes)",
+        f"  input size: {inspection['input_bytes'] / 1024**3:.2f}GB",
+        "  estimated output size: "
+        + ("unknown (variable image size)" if output_bytes is None else f"~{output_bytes / 1024**3:.2f}GB"),
+        "  features:",
+    ]
+    for key, feature in inspection["features"].items():
+        dtype = ("video" if use_videos else "image") if feature["dtype"] in ["image", "video"] else feature["dtype"]
+        lines.append(f"    {key}: {dtype} {tuple(feature['shape'])}")
+    return "\n".join(lines)
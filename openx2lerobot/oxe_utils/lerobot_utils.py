@@ -0,0 +1,97 @@
+from pathlib import Path
+
+import av
+import numpy as np
+from lerobot.datasets.compute_stats import auto_downsample_height_width, get_feature_stats, sample_indices
+
+
+class StreamingVideoEncoder:
+    """
+    Encodes the frames of one camera into an mp4 as soon as they are produced, without the PNG round-trip of
+    LeRobot's image writer. Encoder settings follow `lerobot.datasets.video_utils.encode_video_frames`.
+
+    The frames needed for the episode stats are picked on the fly with `sample_indices`, so the stats match the
+    ones LeRobot computes from the temporary PNGs.
+    """
+
+    def __init__(
+        self,
+        video_path: Path,
+        fps: int,
+        num_frames: int,
+        vcodec: str = "libsvtav1",
+        pix_fmt: str = "yuv420p",
+        g: int | None = 2,
+        crf: int | None = 30,
+        preset: int | None = 12,
+    ):
+        self.video_path = Path(video_path)
+        self.fps = fps
+        self.vcodec = vcodec
+        self.pix_fmt = pix_fmt
+        self.video_options = {}
+        if g is not None:
+            self.video_options["g"] = str(g)
+        if crf is not None:
+            self.video_options["crf"] = str(crf)
+        if vcodec == "libsvtav1" and preset is not None:
+            self.video_options["preset"] = str(preset)
+
+        self.sampled_positions = {idx: i for i, idx in enumerate(sample_indices(num_frames))}
+        self.sampled_images = None
+        self.frame_index = 0
+        self.container = None
+        self.stream = None
+
+    def _open(self, height: int, width: int):
+        self.video_path.parent.mkdir(parents=True, exist_ok=True)
+        self.container = av.open(str(self.video_path), "w")
+        self.stream = self.container.add_stream(self.vcodec, self.fps, options=self.video_options)
+        self.stream.pix_fmt = self.pix_fmt
+        # yuv420p needs even dimensions, pad like `pad=ceil(iw/2)*2:ceil(ih/2)*2` (e.g. bc_z)
+        self.stream.height = height + height % 2
+        self.stream.width = width + width % 2
+
+    def add_frame(self, frame: np.ndarray):
+        if self.container is None:
+            self._open(*frame.shape[:2])
+
+        if self.frame_index in self.sampled_positions:
+            img = auto_downsample_height_width(frame.transpose(2, 0, 1))
+            if self.sampled_images is None:
+                self.sampled_images = np.empty((len(self.sampled_positions), *img.shape), dtype=np.uint8)
+            self.sampled_images[self.sampled_positions[self.frame_index]] = img
+
+        if frame.shape[:2] != (self.stream.height, self.stream.width):
+            pad = ((0, self.stream.height - frame.shape[0]), (0, self.stream.width - frame.shape[1]), (0, 0))
+            frame = np.pad(frame, pad)
+        for packet in self.stream.encode(av.VideoFrame.from_ndarray(frame, format="rgb24")):
+            self.container.mux(packet)
+        self.frame_index += 1
+
+    def add_frames(self, frames: np.ndarray):
+        for frame in frames:
+            self.add_frame(frame)
+
+    def close(self) -> np.ndarray:
+        """Flush the encoder and return the sampled frames, shape [S, C, H, W]."""
+        if self.container is None:
+            raise ValueError(f"No frames were added to {self.video_path}.")
+        for packet in self.stream.encode():
+            self.container.mux(packet)
+        self.container.close()
+        if max(self.sampled_positions) >= self.frame_index:
+            raise ValueError(f"Expected more frames for {self.video_path}, got {self.frame_index}.")
+        return self.sampled_images
+
+    def abort(self):
+        """Close the container without flushing, after a failed episode. The partial mp4 is left to the caller."""
+        if self.container is not None:
+            self.container.close()
+            self.container = None
+
+
+def compute_sampled_images_stats(images: np.ndarray) -> dict:
+    """Same as the image branch of `compute_episode_stats`, from frames that are already sampled."""
+    stats = get_feature_stats(images, axis=(0, 2, 3), keepdims=True)
+    return {k: v if k == "count" else np.squeeze(v / 255.0, axis=0) for k, v in stats.items()}
@@ -0,0 +1,67 @@
+"""
+NumPy counterparts of the helpers in `transform_utils.py`, for trajectories that are already numpy arrays.
+Same semantics, vectorized with `np.searchsorted` instead of a per-step scan.
+"""
+
+from typing import Any, Dict
+
+import numpy as np
+
+
+def binarize_gripper_actions(actions: np.ndarray) -> np.ndarray:
+    """
+    Converts gripper actions from continuous to binary values (0 and 1), see `transform_utils.binarize_gripper_actions`.
+
+    Intermediate values are relabeled as the first open/closed value reached after them (a reverse cumulative fill),
+    trailing intermediate values as the last action in the trajectory.
+    """
+    open_mask, closed_mask = actions > 0.95, actions < 0.05
+    in_between_mask = ~(open_mask | closed_mask)
+
+    settled_indices = np.flatnonzero(~in_between_mask)
+    next_settled = np.searchsorted(settled_indices, np.arange(len(actions)), side="left")
+    settled_values = np.append(open_mask[settled_indices].astype(np.float32), np.float32(actions[-1]))
+
+    return settled_values[next_settled]
+
+
+def invert_gripper_actions(actions: np.ndarray) -> np.ndarray:
+    return 1 - actions
+
+
+def rel2abs_gripper_actions(actions: np.ndarray) -> np.ndarray:
+    """
+    Converts relative gripper actions (+1 for closing, -1 for opening) to absolute actions (0 = closed; 1 = open),
+    see `transform_utils.rel2abs_gripper_actions`.
+    """
+    # Note =>> -1 for closing, 1 for opening, 0 for no change
+    opening_mask, closing_mask = actions < -0.1, actions > 0.1
+    thresholded_actions = np.where(opening_mask, 1, np.where(closing_mask, -1, 0))
+
+    # If no relative grasp, assumes open for whole trajectory
+    start = -1 * thresholded_actions[np.argmax(thresholded_actions != 0)]
+    start = 1 if start == 0 else start
+
+    # forward fill: every step takes the last non-zero action at or before it, `start` before the first one
+    changed_indices = np.flatnonzero(thresholded_actions)
+    last_changed = np.searchsorted(changed_indices, np.arange(len(actions)), side="right")
+    changed_values = np.append(start, thresholded_actions[changed_indices])
+
+    # Note =>> -1 for closed, 1 for open
+    return changed_values[last_changed].astype(np.float32) / 2 + 0.5
+
+
+def map_structure(fn, structure):
+    if isinstance(structure, dict):
+        return {key: map_structure(fn, value) for key, value in structure.items()}
+    return fn(structure)
+
+
+# === Bridge-V2 =>> Dataset-Specific Transform ===
+def relabel_bridge_actions(traj: Dict[str, Any]) -> Dict[str, Any]:
+    """Relabels actions to use reached proprioceptive state; discards last timestep (no-action)."""
+    movement_actions = traj["observation"]["state"][1:, :6] - traj["observation"]["state"][:-1, :6]
+    traj_truncated = map_structure(lambda x: x[:-1], traj)
+    traj_truncated["action"] = np.concatenate([movement_actions, traj["action"][:-1, -1:]], axis=1)
+
+    return traj_truncated
@@ -0,0 +1,117 @@
+"""
+Opt-in per-episode profile of a conversion, enabled with `--profile`.
+
+Stage times are wall times of the main conversion loop:
+    - read: waiting for the next episode of the tf.data pipeline, including the numpy conversion
+    - add_episode: `OpenXDataset.add_episode`, PNG writing or feeding the streaming encoders
+    - save_episode: `OpenXDataset.save_episode`, stats, parquet and videos
+    - image_write, video_encode: waiting for the image writer and for video encoding, nested in the stages above
+decode and transform are measured inside the tf.data graph, which runs in parallel with the main loop, so they show
+how busy the reader threads are rather than adding up to the episode time.
+"""
+
+import csv
+import json
+import os
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+
+MAIN_STAGES = ["read", "add_episode", "save_episode"]
+
+
+def get_dir_size(path: Path) -> int:
+    size = 0
+    for root, _, files in os.walk(path):
+        for file in files:
+            try:
+                size += os.path.getsize(os.path.join(root, file))
+            except FileNotFoundError:
+                # temporary files can be removed while walking
+                pass
+    return size
+
+
+class StageProfiler:
+    def __init__(self, path: Path | None = None):
+        self.path = Path(path) if path is not None else None
+        self.enabled = self.path is not None
+        self.records = []
+        self.current = defaultdict(float)
+
+    @contextmanager
+    def stage(self, name: str):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.current[name] += time.perf_counter() - start
+
+    def end_episode(self, source: str, frames: int, bytes_read: int, bytes_written: int, **graph_stages) -> None:
+        """Records the stages of the finished episode, `graph_stages` are the times measured in the tf.data graph."""
+        if not self.enabled:
+            return
+        stages = {**self.current, **{name: float(seconds) for name, seconds in graph_stages.items()}}
+        seconds = sum(stages.get(name, 0.0) for name in MAIN_STAGES)
+        self.records.append(
+            {
+                "source": source,
+                "frames": int(frames),
+                "seconds": round(seconds, 4),
+                "frames_per_second": round(frames / seconds, 2) if seconds > 0 else None,
+                "bytes_read": int(bytes_read),
+                "bytes_written": int(bytes_written),
+                **{f"{name}_seconds": round(value, 4) for name, value in stages.items()},
+            }
+        )
+        self.current = defaultdict(float)
+
+    def totals(self) -> dict:
+        totals = defaultdict(float)
+        for record in self.records:
+            for key, value in record.items():
+                if key.endswith("_seconds") or key in ["frames", "seconds", "bytes_read", "bytes_written"]:
+                    totals[key] += value
+        totals["episodes"] = len(self.records)
+        totals["frames_per_second"] = totals["frames"] / totals["seconds"] if totals["seconds"] > 0 else None
+        return dict(totals)
+
+    def summary(self) -> str:
+        totals = self.totals()
+        if not self.records or not totals["seconds"]:
+            return ""
+        shares = " ".join(
+            f"{name} {100 * totals.get(f'{name}_seconds', 0.0) / totals['seconds']:.0f}%" for name in MAIN_STAGES
+        )
+        return (
+            f"{totals['frames_per_second']:.1f} frames/s | {shares} | "
+            f"read {totals['bytes_read'] / 1024**2:.0f}MB, written {totals['bytes_written'] / 1024**2:.0f}MB"
+        )
+
+    @classmethod
+    def merge(cls, paths: list[Path], path: Path) -> "StageProfiler":
+        """Merges the JSON profiles of several shards into one profile saved at `path`."""
+        profiler = cls(path)
+        for shard_path in paths:
+            if shard_path.exists():
+                profiler.records.extend(json.loads(shard_path.read_text())["episodes"])
+        profiler.save()
+        return profiler
+
+    def save(self) -> None:
+        """Writes the profile as CSV (one row per episode) or JSON (episodes and totals), from the path suffix."""
+        if not self.enabled:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.path.suffix == ".csv":
+            fieldnames = list(dict.fromkeys(key for record in self.records for key in record))
+            with open(self.path, "w", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=fieldnames)
+                writer.writeheader()
+                writer.writerows(self.records)
+        else:
+            self.path.write_text(json.dumps({"episodes": self.records, "total": self.totals()}, indent=4))
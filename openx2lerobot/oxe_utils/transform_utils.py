@@ -18,7 +18,7 @@ def binarize_gripper_actions(actions: tf.Tensor) -> tf.Tensor:
     In the edge case that the trajectory ends with an intermediate value, we give up on binarizing and relabel that
     chunk of intermediate values as the last action in the trajectory.
 
-    The `scan_fn` implements the following logic:
+    This implements the following logic as a reverse fill, without a per-step `tf.scan`:
         new_actions = np.empty_like(actions)
         carry = actions[-1]
         for i in reversed(range(actions.shape[0])):
@@ -32,10 +32,12 @@ def binarize_gripper_actions(actions: tf.Tensor) -> tf.Tensor:
     in_between_mask = tf.logical_not(tf.logical_or(open_mask, closed_mask))
     is_open_float = tf.cast(open_mask, tf.float32)
 
-    def scan_fn(carry, i):
-        return tf.cond(in_between_mask[i], lambda: tf.cast(carry, tf.float32), lambda: is_open_float[i])
+    # for every step, find the first step at or after it that is not in between
+    settled_indices = tf.where(tf.logical_not(in_between_mask))[:, 0]
+    next_settled = tf.searchsorted(settled_indices, tf.range(tf.shape(actions, out_type=tf.int64)[0]), side="left")
+    settled_values = tf.concat([tf.gather(is_open_float, settled_indices), tf.cast(actions[-1:], tf.float32)], axis=0)
 
-    return tf.scan(scan_fn, tf.range(tf.shape(actions)[0]), actions[-1], reverse=True)
+    return tf.gather(settled_values, next_settled)
 
 
 def invert_gripper_actions(actions: tf.Tensor) -> tf.Tensor:
@@ -52,15 +54,17 @@ def rel2abs_gripper_actions(actions: tf.Tensor) -> tf.Tensor:
     opening_mask, closing_mask = actions < -0.1, actions > 0.1
     thresholded_actions = tf.where(opening_mask, 1, tf.where(closing_mask, -1, 0))
 
-    def scan_fn(carry, i):
-        return tf.cond(thresholded_actions[i] == 0, lambda: carry, lambda: thresholded_actions[i])
-
     # If no relative grasp, assumes open for whole trajectory
     start = -1 * thresholded_actions[tf.argmax(thresholded_actions != 0, axis=0)]
-    start = tf.cond(start == 0, lambda: 1, lambda: start)
+    start = tf.where(start == 0, 1, start)
+
+    # forward fill: every step takes the last non-zero action at or before it, `start` before the first one
+    changed_indices = tf.where(thresholded_actions != 0)[:, 0]
+    last_changed = tf.searchsorted(changed_indices, tf.range(tf.shape(actions, out_type=tf.int64)[0]), side="right")
+    changed_values = tf.concat([start[None], tf.gather(thresholded_actions, changed_indices)], axis=0)
 
     # Note =>> -1 for closed, 1 for open
-    new_actions = tf.scan(scan_fn, tf.range(tf.shape(actions)[0]), start)
+    new_actions = tf.gather(changed_values, last_changed)
     new_actions = tf.cast(new_actions, tf.float32) / 2 + 0.5
 
     return new_actions
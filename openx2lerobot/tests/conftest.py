@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# the scripts run from `openx2lerobot/`, so modules are imported as `oxe_utils.*`
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
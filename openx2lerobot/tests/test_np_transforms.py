@@ -0,0 +1,140 @@
+"""
+Runs every tf transform of `oxe_utils.transforms` and its port in `oxe_utils.np_transforms` on the same synthetic
+trajectory, and checks that both produce the same trajectory.
+"""
+
+import copy
+import inspect
+
+import numpy as np
+import pytest
+
+tf = pytest.importorskip("tensorflow")
+
+from oxe_utils.np_transforms import OXE_STANDARDIZATION_TRANSFORMS as NP_OXE_STANDARDIZATION_TRANSFORMS  # noqa: E402
+from oxe_utils.transforms import OXE_STANDARDIZATION_TRANSFORMS  # noqa: E402
+
+NUM_STEPS = 12
+STATE_DIM = 8
+IMAGE_KEYS = [
+    "image",
+    "wrist_image",
+    "hand_image",
+    "exterior_image_1_left",
+    "exterior_image_2_left",
+    "image_wrist_1",
+    "image_wrist_2",
+    "image_side_1",
+    "image_side_2",
+]
+DEPTH_KEYS = ["depth", "depth_image", "depth_additional_view", "image_with_depth"]
+OBSERVATION_KEYS = [
+    "state",
+    "proprio",
+    "eef_state",
+    "EEF_state",
+    "gripper_state",
+    "joint_state",
+    "robot_obs",
+    "robot_state",
+    "end_effector_pose",
+    "end_effector_cartesian_pos",
+    "cartesian_position",
+    "gripper_position",
+    "state_eef",
+    "state_gripper",
+    "eef_pose",
+    "tcp_base",
+    "position",
+    "yaw",
+]
+# keys with a single value per step, the others are (NUM_STEPS, STATE_DIM)
+SCALAR_OBSERVATION_KEYS = ["gripper", "gripper_width", "state_gripper_pose"]
+ACTION_KEYS = [
+    "world_vector",
+    "rotation_delta",
+    "rel_actions_world",
+    "tcp_base",
+    "future/xyz_residual",
+    "future/axis_angle_residual",
+    "future/target_close",
+]
+SCALAR_ACTION_KEYS = ["open_gripper", "gripper"]
+# `gripper_closedness_action` is (NUM_STEPS, 1), except for these datasets
+SCALAR_GRIPPER_CLOSEDNESS_DATASETS = ["viola", "berkeley_autolab_ur5", "columbia_cairlab_pusht_real"]
+
+
+def make_trajectory(dataset_name: str) -> dict:
+    """A raw trajectory holding every key read by the transforms, with random values."""
+    rng = np.random.default_rng(0)
+
+    def floats(*shape):
+        return rng.uniform(-1, 1, (NUM_STEPS, *shape)).astype(np.float32)
+
+    observation = {key: floats(STATE_DIM) for key in OBSERVATION_KEYS}
+    observation.update({key: floats() for key in SCALAR_OBSERVATION_KEYS})
+    observation.update({key: rng.integers(0, 256, (NUM_STEPS, 4, 6, 3), dtype=np.uint8) for key in IMAGE_KEYS})
+    observation.update({key: rng.integers(0, 256, (NUM_STEPS, 4, 6, 1), dtype=np.uint8) for key in DEPTH_KEYS})
+    # droid swaps its exterior cameras at random
+    observation["exterior_image_2_left"] = observation["exterior_image_1_left"].copy()
+    observation["natural_language_instruction"] = np.array([b"pick up the cube"] * NUM_STEPS, dtype=object)
+    # language_table stores its instruction as zero-padded unicode code points
+    observation["instruction"] = np.zeros((NUM_STEPS, 16), dtype=np.int32)
+    observation["instruction"][:, :4] = [ord(c) for c in "push"]
+
+    source = inspect.getsource(OXE_STANDARDIZATION_TRANSFORMS[dataset_name])
+    # the transforms reading `trajectory["action"]["..."]` get the action as a dict
+    if 'trajectory["action"]["' in source:
+        action = {key: floats(STATE_DIM) for key in ACTION_KEYS}
+        action.update({key: floats() for key in SCALAR_ACTION_KEYS})
+        if dataset_name in SCALAR_GRIPPER_CLOSEDNESS_DATASETS:
+            action["gripper_closedness_action"] = floats()
+        else:
+            action["gripper_closedness_action"] = floats(1)
+    else:
+        action = floats(STATE_DIM)
+
+    trajectory = {
+        "observation": observation,
+        "action": action,
+        "language_instruction": np.array([b"pick up the cube"] * NUM_STEPS, dtype=object),
+    }
+    # bridge slices every top-level key, so the other ones are only added where they are read
+    if 'trajectory["action_dict"]' in source:
+        trajectory["action_dict"] = {"cartesian_velocity": floats(STATE_DIM), "gripper_position": floats(1)}
+    if 'trajectory["ground_truth_states"]' in source:
+        trajectory["ground_truth_states"] = {"EE": floats(STATE_DIM)}
+    return trajectory
+
+
+def assert_same_trajectory(tf_traj, np_traj, path: str = "trajectory"):
+    if isinstance(tf_traj, dict):
+        assert isinstance(np_traj, dict), path
+        assert sorted(tf_traj) == sorted(np_traj), path
+        for key in tf_traj:
+            assert_same_trajectory(tf_traj[key], np_traj[key], f"{path}[{key!r}]")
+        return
+
+    tf_value, np_value = np.asarray(tf_traj), np.asarray(np_traj)
+    assert tf_value.shape == np_value.shape, path
+    if tf_value.dtype == object or np_value.dtype == object:
+        assert tf_value.tolist() == np_value.tolist(), path
+    else:
+        np.testing.assert_allclose(tf_value, np_value, rtol=1e-5, atol=1e-6, err_msg=path)
+
+
+def test_same_datasets():
+    assert list(NP_OXE_STANDARDIZATION_TRANSFORMS) == list(OXE_STANDARDIZATION_TRANSFORMS)
+
+
+@pytest.mark.parametrize("dataset_name", list(OXE_STANDARDIZATION_TRANSFORMS))
+def test_same_trajectory(dataset_name):
+    if "tensorflow_graphics" in inspect.getsource(OXE_STANDARDIZATION_TRANSFORMS[dataset_name]):
+        pytest.importorskip("tensorflow_graphics")
+
+    traj = make_trajectory(dataset_name)
+    tf_traj = OXE_STANDARDIZATION_TRANSFORMS[dataset_name](tf.nest.map_structure(tf.constant, copy.deepcopy(traj)))
+    tf_traj = tf.nest.map_structure(lambda x: x.numpy(), tf_traj)
+    np_traj = NP_OXE_STANDARDIZATION_TRANSFORMS[dataset_name](copy.deepcopy(traj))
+
+    assert_same_trajectory(tf_traj, np_traj)
@@ -0,0 +1,97 @@
+"""
+Checks the vectorized gripper helpers of `oxe_utils.np_transform_utils` and `oxe_utils.transform_utils` against the
+per-step loops they replace.
+"""
+
+import numpy as np
+import pytest
+from oxe_utils import np_transform_utils
+
+
+def binarize_gripper_actions_loop(actions: np.ndarray) -> np.ndarray:
+    open_mask, closed_mask = actions > 0.95, actions < 0.05
+    in_between_mask = ~(open_mask | closed_mask)
+    new_actions = np.empty_like(actions, dtype=np.float32)
+    carry = actions[-1]
+    for i in reversed(range(actions.shape[0])):
+        if not in_between_mask[i]:
+            carry = float(open_mask[i])
+        new_actions[i] = carry
+    return new_actions
+
+
+def rel2abs_gripper_actions_loop(actions: np.ndarray) -> np.ndarray:
+    thresholded_actions = np.where(actions < -0.1, 1, np.where(actions > 0.1, -1, 0))
+    start = -1 * thresholded_actions[np.argmax(thresholded_actions != 0)]
+    carry = 1 if start == 0 else start
+    new_actions = np.empty(actions.shape[0], dtype=np.float32)
+    for i in range(actions.shape[0]):
+        if thresholded_actions[i] != 0:
+            carry = thresholded_actions[i]
+        new_actions[i] = carry / 2 + 0.5
+    return new_actions
+
+
+def make_absolute_actions(rng: np.random.Generator, length: int) -> np.ndarray:
+    """Open (~1), closed (~0) and in-between gripper values, in runs like real trajectories."""
+    values = rng.choice([0.0, 0.02, 0.5, 0.7, 0.97, 1.0], size=length)
+    return np.repeat(values, rng.integers(1, 4, size=length))[:length].astype(np.float32)
+
+
+def make_relative_actions(rng: np.random.Generator, length: int) -> np.ndarray:
+    """Sparse +1 (close) and -1 (open) commands with small noise around 0."""
+    actions = rng.uniform(-0.05, 0.05, size=length)
+    commands = rng.random(length) < 0.1
+    actions[commands] = rng.choice([-1.0, 1.0], size=commands.sum())
+    return actions.astype(np.float32)
+
+
+EDGE_CASES = [
+    np.array([0.5], dtype=np.float32),
+    np.array([1.0], dtype=np.float32),
+    np.full(5, 0.5, dtype=np.float32),
+    np.zeros(5, dtype=np.float32),
+    np.array([0.5, 0.5, 1.0, 0.5, 0.0, 0.5], dtype=np.float32),
+    np.array([0.0, 1.0, -1.0, 0.0, 1.0], dtype=np.float32),
+]
+
+
+def iter_trajectories(make_actions):
+    rng = np.random.default_rng(0)
+    yield from EDGE_CASES
+    for length in rng.integers(1, 200, size=50):
+        yield make_actions(rng, length)
+
+
+def test_np_binarize_gripper_actions():
+    for actions in iter_trajectories(make_absolute_actions):
+        np.testing.assert_array_equal(
+            np_transform_utils.binarize_gripper_actions(actions), binarize_gripper_actions_loop(actions)
+        )
+
+
+def test_np_rel2abs_gripper_actions():
+    for actions in iter_trajectories(make_relative_actions):
+        np.testing.assert_array_equal(
+            np_transform_utils.rel2abs_gripper_actions(actions), rel2abs_gripper_actions_loop(actions)
+        )
+
+
+def test_tf_binarize_gripper_actions():
+    pytest.importorskip("tensorflow")
+    from oxe_utils import transform_utils
+
+    for actions in iter_trajectories(make_absolute_actions):
+        np.testing.assert_array_equal(
+            transform_utils.binarize_gripper_actions(actions).numpy(), binarize_gripper_actions_loop(actions)
+        )
+
+
+def test_tf_rel2abs_gripper_actions():
+    pytest.importorskip("tensorflow")
+    from oxe_utils import transform_utils
+
+    for actions in iter_trajectories(make_relative_actions):
+        np.testing.assert_array_equal(
+            transform_utils.rel2abs_gripper_actions(actions).numpy(), rel2abs_gripper_actions_loop(actions)
+        )
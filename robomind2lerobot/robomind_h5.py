@@ -3,6 +3,8 @@ import gc
 import json
 import logging
 import shutil
+import sys
+import tempfile
 from pathlib import Path
 
 import numpy as np
@@ -10,12 +12,22 @@ import pandas as pd
 import ray
 from lerobot.datasets.compute_stats import aggregate_stats
 from lerobot.datasets.lerobot_dataset import LeRobotDataset, LeRobotDatasetMetadata
-from lerobot.datasets.utils import flatten_dict, validate_episode_buffer, write_info, write_stats
+from lerobot.datasets.utils import flatten_dict, validate_episode_buffer, validate_frame, write_info, write_stats
 from lerobot.datasets.video_utils import get_safe_default_codec
 from ray.runtime_env import RuntimeEnv
 from robomind_uitls.configs import ROBOMIND_CONFIG
 from robomind_uitls.lerobot_uitls import compute_episode_stats, generate_features_from_config
-from robomind_uitls.robomind_uitls import load_local_dataset
+from robomind_uitls.robomind_uitls import (
+    DecodeError,
+    get_image_keys,
+    iter_camera_windows,
+    load_local_dataset,
+    load_local_episode,
+)
+
+# the streaming video encoder is shared with the OpenX converter next to this one
+sys.path.append(str(Path(__file__).resolve().parents[1] / "openx2lerobot"))
+from oxe_utils.lerobot_utils import StreamingVideoEncoder, compute_sampled_images_stats
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
@@ -70,6 +82,7 @@ class RoboMINDDataset(LeRobotDataset):
         image_writer_threads: int = 0,
         video_backend: str | None = None,
         batch_encoding_size: int = 1,
+        stream_videos: bool = False,
     ) -> "LeRobotDataset":
         """Create a LeRobot Dataset from scratch in order to record data."""
         obj = cls.__new__(cls)
@@ -101,8 +114,79 @@ class RoboMINDDataset(LeRobotDataset):
         obj.delta_timestamps = None
         obj.delta_indices = None
         obj.video_backend = video_backend if video_backend is not None else get_safe_default_codec()
+        # with stream_videos, episodes are added with `add_episode` and videos are encoded while cameras are decoded
+        obj.stream_videos = stream_videos
+        obj.video_encodings = {}
         return obj
 
+    def add_episode(self, episode: dict, camera_windows: dict, task: str) -> None:
+        """
+        Streaming version of `add_frame`: `episode` holds the states and actions of the whole episode as columns,
+        and `camera_windows` the windows of decoded frames of each camera, see `iter_camera_windows`. Cameras are
+        consumed one at a time, video frames are piped to a `StreamingVideoEncoder` and depth frames are written as
+        PNGs, so that a single window of frames is held in memory. To save the episode, the 'save_episode()' method
+        then needs to be called.
+        """
+        num_frames = len(next(iter(episode.values())))
+        features = {key: value for key, value in self.features.items() if key not in camera_windows}
+        validate_frame({**{key: value[0] for key, value in episode.items()}, "task": task}, features)
+
+        if self.episode_buffer is None:
+            self.episode_buffer = self.create_episode_buffer()
+        episode_index = self.episode_buffer["episode_index"]
+        self.episode_buffer["frame_index"] = np.arange(num_frames)
+        self.episode_buffer["timestamp"] = np.arange(num_frames) / self.fps
+        self.episode_buffer["task"] = [task] * num_frames
+        self.episode_buffer.update(episode)
+
+        encoder = None
+        try:
+            for key, windows in camera_windows.items():
+                is_video = self.features[key]["dtype"] == "video"
+                if is_video:
+                    video_path = Path(tempfile.mkdtemp(dir=self.root)) / f"{key}_{episode_index:03d}.mp4"
+                    encoder = StreamingVideoEncoder(video_path, self.fps, num_frames)
+                else:
+                    self._get_image_file_dir(episode_index, key).mkdir(parents=True, exist_ok=True)
+                self.episode_buffer[key] = []
+
+                frame_count = 0
+                for frames in windows:
+                    # frames past the end of the states are dropped, like `load_local_dataset` does
+                    frames = frames[: num_frames - frame_count]
+                    if frame_count == 0 and len(frames) and frames.shape[1:] != self.features[key]["shape"]:
+                        raise ValueError(
+                            f"The feature '{key}' of shape '{frames.shape[1:]}' does not have the expected shape "
+                            f"'{self.features[key]['shape']}'."
+                        )
+                    if is_video:
+                        encoder.add_frames(frames)
+                    else:
+                        for frame_index, image in enumerate(frames, start=frame_count):
+                            img_path = self._get_image_file_path(episode_index, key, frame_index)
+                            self._save_image(image, img_path, compress_level=6)
+                            self.episode_buffer[key].append(str(img_path))
+                    frame_count += len(frames)
+                if frame_count != num_frames:
+                    raise ValueError(f"The feature '{key}' has {frame_count} frames, expected {num_frames}.")
+                if is_video:
+                    self.video_encodings[key] = (video_path, encoder.close())
+                    encoder = None
+        except Exception:
+            # drop the partial episode: open encoder, temporary mp4s, depth PNGs and the buffer
+            for windows in camera_windows.values():
+                windows.close()
+            if encoder is not None:
+                encoder.abort()
+                shutil.rmtree(encoder.video_path.parent, ignore_errors=True)
+            for video_path, _ in self.video_encodings.values():
+                shutil.rmtree(video_path.parent, ignore_errors=True)
+            self.video_encodings = {}
+            self.clear_episode_buffer(delete_images=True)
+            raise
+
+        self.episode_buffer["size"] = num_frames
+
     def save_episode(self, split, action_config: dict, episode_data: dict | None = None) -> None:
         """
         This will save to disk the current episode in self.episode_buffer.
@@ -139,13 +223,25 @@ class RoboMINDDataset(LeRobotDataset):
             episode_buffer[key] = np.stack(episode_buffer[key]).squeeze()
 
         self._wait_image_writer()
-        ep_stats = compute_episode_stats(episode_buffer, self.features)
+        if self.stream_videos:
+            # streamed videos have no PNGs, their stats come from the frames sampled by the encoders
+            ep_stats = compute_episode_stats(
+                {key: value for key, value in episode_buffer.items() if key not in self.meta.video_keys}, self.features
+            )
+            for video_key in self.meta.video_keys:
+                ep_stats[video_key] = compute_sampled_images_stats(self.video_encodings[video_key][1])
+        else:
+            ep_stats = compute_episode_stats(episode_buffer, self.features)
 
         ep_metadata = self._save_episode_data(episode_buffer)
         has_video_keys = len(self.meta.video_keys) > 0
         use_batched_encoding = self.batch_encoding_size > 1
 
-        if has_video_keys and not use_batched_encoding:
+        if self.stream_videos:
+            for video_key in self.meta.video_keys:
+                video_path, _ = self.video_encodings.pop(video_key)
+                ep_metadata.update(self._save_episode_video(video_key, episode_index, temp_path=video_path))
+        elif has_video_keys and not use_batched_encoding:
             for video_key in self.meta.video_keys:
                 ep_metadata.update(self._save_episode_video(video_key, episode_index))
 
@@ -153,7 +249,7 @@ class RoboMINDDataset(LeRobotDataset):
         ep_metadata.update({"action_config": action_config})
         self.meta.save_episode(split, episode_index, episode_length, episode_tasks, ep_stats, ep_metadata)
 
-        if has_video_keys and use_batched_encoding:
+        if has_video_keys and use_batched_encoding and not self.stream_videos:
             # Check if we should trigger batch encoding
             self.episodes_since_last_encoding += 1
             if self.episodes_since_last_encoding == self.batch_encoding_size:
@@ -183,7 +279,16 @@ def get_all_tasks(src_path: Path, output_path: Path, embodiment: str):
             )
 
 
-def save_as_lerobot_dataset(task: tuple[dict, Path, str], src_path, benchmark, embodiment, save_depth):
+def save_as_lerobot_dataset(
+    task: tuple[dict, Path, str],
+    src_path,
+    benchmark,
+    embodiment,
+    save_depth,
+    decode_workers: int = 8,
+    stream_videos: bool = False,
+    chunk_size: int | None = None,
+):
     task_type, splits, local_dir, task_instruction = task
 
     config = ROBOMIND_CONFIG[embodiment]
@@ -206,6 +311,7 @@ def save_as_lerobot_dataset(task: tuple[dict, Path, str], src_path, benchmark, e
         fps=30,
         robot_type=embodiment,
         features=features,
+        stream_videos=stream_videos,
     )
 
     logging.info(f"start processing for {benchmark}, {embodiment}, {task_type}, saving to {local_dir}")
@@ -221,16 +327,35 @@ def save_as_lerobot_dataset(task: tuple[dict, Path, str], src_path, benchmark, e
         else:
             action_config = {}
         for episode_path in path.glob("**/trajectory.hdf5"):
-            status, raw_dataset, err = load_local_dataset(episode_path, config, save_depth, bgr2rgb)
-            if status and len(raw_dataset) >= 50:
+            if stream_videos:
+                status, raw_dataset, err = load_local_episode(episode_path, config)
+                num_frames = len(next(iter(raw_dataset.values()))) if status else 0
+            else:
+                status, raw_dataset, err = load_local_dataset(episode_path, config, save_depth, bgr2rgb, decode_workers)
+                num_frames = len(raw_dataset)
+            if status and num_frames >= 50:
                 try:
-                    for frame_data in raw_dataset:
-                        frame_data["task"] = task_instruction
-                        dataset.add_frame(frame_data)
+                    if stream_videos:
+                        # cameras are decoded lazily, one window at a time, while they are added
+                        camera_windows = {
+                            key: iter_camera_windows(episode_path, image_key, chunk_size, bgr2rgb, decode_workers)
+                            for key, image_key in get_image_keys(config, save_depth).items()
+                        }
+                        try:
+                            dataset.add_episode(raw_dataset, camera_windows, task_instruction)
+                        except (FileNotFoundError, OSError, KeyError, DecodeError) as e:
+                            # a corrupt episode, `add_episode` already dropped what it wrote
+                            logging.warning(f"Skipped {episode_path}: {str(e)}")
+                            gc.collect()
+                            continue
+                    else:
+                        for frame_data in raw_dataset:
+                            frame_data["task"] = task_instruction
+                            dataset.add_frame(frame_data)
                     dataset.save_episode(
                         split, action_config.get(episode_path.parent.parent.name, {"task_summary": None, "steps": None})
                     )
-                    logging.info(f"process done for {path}, len {len(raw_dataset)}")
+                    logging.info(f"process done for {path}, len {num_frames}")
                 except Exception:
                     # [HACK]: not consistent image shape...
                     if config["images"]["camera_top"]["shape"] == (720, 1280, 3):
@@ -239,10 +364,12 @@ def save_as_lerobot_dataset(task: tuple[dict, Path, str], src_path, benchmark, e
                     else:
                         config["images"]["camera_top"]["shape"] = (720, 1280, 3)
                         config["images"]["camera_top_depth"]["shape"] = (720, 1280, 1)
-                    save_as_lerobot_dataset(task, src_path, benchmark, embodiment, save_depth)
+                    save_as_lerobot_dataset(
+                        task, src_path, benchmark, embodiment, save_depth, decode_workers, stream_videos, chunk_size
+                    )
                     return
             else:
-                logging.warning(f"Skipped {episode_path}: len of dataset:{len(raw_dataset)} or {str(err)}")
+                logging.warning(f"Skipped {episode_path}: len of dataset:{num_frames} or {str(err)}")
             gc.collect()
 
     if dataset.meta.total_episodes == 0:
@@ -257,11 +384,16 @@ def main(
     embodiments: list[str],
     cpus_per_task: int,
     save_depth: bool,
+    decode_workers: int = 8,
+    stream_videos: bool = False,
+    chunk_size: int | None = None,
     debug: bool = False,
 ):
     if debug:
         tasks = get_all_tasks(src_path / benchmark, output_path, embodiments[0])
-        save_as_lerobot_dataset(next(tasks), src_path, benchmark, embodiments[0], save_depth)
+        save_as_lerobot_dataset(
+            next(tasks), src_path, benchmark, embodiments[0], save_depth, decode_workers, stream_videos, chunk_size
+        )
     else:
         runtime_env = RuntimeEnv(
             env_vars={"HDF5_USE_FILE_LOCKING": "FALSE", "HF_DATASETS_DISABLE_PROGRESS_BARS": "TRUE"}
@@ -277,7 +409,10 @@ def main(
         for embodiment in embodiments:
             tasks = get_all_tasks(src_path / benchmark, output_path, embodiment)
             for task in tasks:
-                futures.append((task[1], remote_task.remote(task, src_path, benchmark, embodiment, save_depth)))
+                future = remote_task.remote(
+                    task, src_path, benchmark, embodiment, save_depth, decode_workers, stream_videos, chunk_size
+                )
+                futures.append((task[1], future))
 
         for task_path, future in futures:
             try:
@@ -319,6 +454,15 @@ if __name__ == "__main__":
     )
     parser.add_argument("--cpus-per-task", type=int, default=2)
     parser.add_argument("--save-depth", action="store_true")
+    parser.add_argument("--decode-workers", type=int, default=8, help="threads decoding the frames of each camera")
+    parser.add_argument(
+        "--stream-videos",
+        action="store_true",
+        help="decode one camera at a time and encode its frames on the fly, instead of holding the whole episode",
+    )
+    parser.add_argument(
+        "--chunk-size", type=int, help="with --stream-videos, decode cameras in windows of this many frames"
+    )
     parser.add_argument("--debug", action="store_true")
     args = parser.parse_args()
 
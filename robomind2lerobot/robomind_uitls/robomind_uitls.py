@@ -1,3 +1,4 @@
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import cv2
@@ -5,57 +6,82 @@ import h5py
 import numpy as np
 
 
-def decode_images(camera_key, input_images, bgr2rgb: bool = False):
+class DecodeError(ValueError):
+    """A frame of a camera can not be decoded, the episode is skipped instead of retried with another shape."""
+
+
+def decode_image(camera_key: str, buffer) -> np.ndarray:
+    """Decodes one encoded frame, or reshapes it when the frame was stored raw."""
+    buffer = buffer if isinstance(buffer, np.ndarray) else np.frombuffer(buffer, dtype=np.uint8)
     if "depth" not in camera_key:
-        rgb_images = []
-        camera_rgb_images = input_images
-        for camera_rgb_image in camera_rgb_images:
-            camera_rgb_image = np.array(camera_rgb_image)
-            rgb = cv2.imdecode(camera_rgb_image, cv2.IMREAD_COLOR)
-            if rgb is None:
-                rgb = np.frombuffer(camera_rgb_image, dtype=np.uint8)
-                if rgb.size == 2764800:
-                    rgb = rgb.reshape(720, 1280, 3)
-                elif rgb.size == 921600:
-                    rgb = rgb.reshape(480, 640, 3)
-            if bgr2rgb:
-                rgb = rgb[..., ::-1]
-            rgb_images.append(rgb)
-        rgb_images = np.asarray(rgb_images)
-        return rgb_images
+        image = cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+        if image is None:
+            if buffer.size == 2764800:
+                image = buffer.reshape(720, 1280, 3)
+            elif buffer.size == 921600:
+                image = buffer.reshape(480, 640, 3)
     else:
-        depth_images = []
-        camera_depth_images = input_images
-        for camera_depth_image in camera_depth_images:
-            if isinstance(camera_depth_image, np.ndarray):
-                depth_array = camera_depth_image
-            else:
-                depth_array = np.frombuffer(camera_depth_image, dtype=np.uint8)
-            depth = cv2.imdecode(depth_array, cv2.IMREAD_UNCHANGED)
-            if depth is None:
-                if depth_array.size == 921600:
-                    depth = depth_array.reshape(720, 1280)
-                elif depth_array.size == 307200:
-                    depth = depth_array.reshape(480, 640)
-            depth_images.append(depth)
-        depth_images = np.asarray(depth_images)[..., None]
-        return depth_images
-
-
-def load_local_dataset(episode_path: Path, config: dict, save_depth: bool, bgr2rgb: bool = False):
+        image = cv2.imdecode(buffer, cv2.IMREAD_UNCHANGED)
+        if image is None:
+            if buffer.size == 921600:
+                image = buffer.reshape(720, 1280)
+            elif buffer.size == 307200:
+                image = buffer.reshape(480, 640)
+    if image is None:
+        raise DecodeError(f"Can not decode a frame of {camera_key} with {buffer.size} bytes.")
+    return image
+
+
+def decode_images(camera_key, input_images, bgr2rgb: bool = False, num_workers: int = 8):
+    """
+    Decodes the frames of a camera into one preallocated array, (T, H, W, 3) uint8 for rgb and (T, H, W, 1) for
+    depth. The variable-length HDF5 dataset is read in one call, frames are decoded by a thread pool (OpenCV
+    releases the GIL) and written straight into their slot, with `cv2.cvtColor` doing BGR -> RGB into the slot.
+    """
+    buffers = input_images[()] if isinstance(input_images, h5py.Dataset) else input_images
+    if len(buffers) == 0:
+        return np.empty((0, 0, 0, 1 if "depth" in camera_key else 3), dtype=np.uint8)
+
+    first_image = decode_image(camera_key, buffers[0])
+    images = np.empty((len(buffers), *first_image.shape), dtype=first_image.dtype)
+
+    def decode(i: int):
+        image = first_image if i == 0 else decode_image(camera_key, buffers[i])
+        if image.shape != first_image.shape:
+            raise DecodeError(f"Frame {i} of {camera_key} has shape {image.shape}, expected {first_image.shape}.")
+        if bgr2rgb and "depth" not in camera_key:
+            cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=images[i])
+        else:
+            images[i] = image
+
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        # consume the results to raise the exceptions of the workers
+        list(executor.map(decode, range(len(buffers))))
+
+    return images[..., None] if "depth" in camera_key else images
+
+
+def get_image_keys(config: dict, save_depth: bool) -> dict[str, str]:
+    """Maps the image features to their HDF5 dataset."""
+    image_keys = {}
+    for key in config["images"]:
+        if save_depth and "depth" in key:
+            image_keys[f"observation.images.{key}"] = f"observations/depth_images/{key[:-6]}"
+        elif "depth" not in key:
+            image_keys[f"observation.images.{key}"] = f"observations/rgb_images/{key}"
+    return image_keys
+
+
+def load_local_dataset(
+    episode_path: Path, config: dict, save_depth: bool, bgr2rgb: bool = False, decode_workers: int = 8
+):
     try:
         images = {}
         states = {}
         actions = {}
         with h5py.File(episode_path, "r") as file:
-            for key in config["images"]:
-                if save_depth and "depth" in key:
-                    image_key = f"observations/depth_images/{key[:-6]}"
-                elif "depth" not in key:
-                    image_key = f"observations/rgb_images/{key}"
-                else:
-                    continue
-                images[f"observation.images.{key}"] = decode_images(image_key, file[image_key], bgr2rgb)
+            for key, image_key in get_image_keys(config, save_depth).items():
+                images[key] = decode_images(image_key, file[image_key], bgr2rgb, decode_workers)
             for key in config["states"]:
                 states[f"observation.states.{key}"] = np.array(file[f"puppet/{key}"], dtype=np.float32)
             for key in config["actions"]:
@@ -72,5 +98,35 @@ def load_local_dataset(episode_path: Path, config: dict, save_depth: bool, bgr2r
         ]
         return True, frames, ""
 
-    except (FileNotFoundError, OSError, KeyError) as e:
+    # `decode_images` raises a ValueError (`DecodeError`) on frames it can not decode
+    except (FileNotFoundError, OSError, KeyError, ValueError) as e:
         return False, [], e
+
+
+def load_local_episode(episode_path: Path, config: dict):
+    """
+    Streaming version of `load_local_dataset`: only loads the states and actions, as `{key: ndarray[T, ...]}`.
+    Cameras are decoded later by `iter_camera_windows`.
+    """
+    try:
+        episode = {}
+        with h5py.File(episode_path, "r") as file:
+            for key in config["states"]:
+                episode[f"observation.states.{key}"] = np.array(file[f"puppet/{key}"], dtype=np.float32)
+            for key in config["actions"]:
+                episode[f"actions.{key}"] = np.array(file[f"master/{key}"], dtype=np.float32)
+        return True, episode, ""
+
+    except (FileNotFoundError, OSError, KeyError) as e:
+        return False, {}, e
+
+
+def iter_camera_windows(
+    episode_path: Path, image_key: str, window_size: int | None = None, bgr2rgb: bool = False, decode_workers: int = 8
+):
+    """Yields the decoded frames of one camera, `window_size` frames at a time or all of them at once."""
+    with h5py.File(episode_path, "r") as file:
+        dataset = file[image_key]
+        window_size = window_size or max(len(dataset), 1)
+        for start in range(0, len(dataset), window_size):
+            yield decode_images(image_key, dataset[start : start + window_size], bgr2rgb, decode_workers)